@@ -0,0 +1,142 @@
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from result_cache import file_hash
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no reflinks, hardlinks are used instead
+    fcntl = None
+
+# ioctl request cloning a whole file on Linux (btrfs, XFS, ...):
+FICLONE = 0x40049409
+
+'''
+Creates a copy-on-write clone of a file (reflink). Only supported by some Linux filesystems.
+
+Outputs:
+cloned [bool] = whether the clone was created
+'''
+def clone_file(source, destination):
+
+    if fcntl is None:
+        return False
+
+    try:
+        with open(source, "rb") as infile, open(destination, "wb") as outfile:
+            fcntl.ioctl(outfile.fileno(), FICLONE, infile.fileno())
+        return True
+    except OSError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        return False
+
+'''
+Content-hashed store of large artifacts (meshes, geometry, results) shared by all campaigns. Every unique file
+is kept once as objects/<first two hex digits>/<sha256>, and the files in the design folders become reflinks
+(copy-on-write clones) or hardlinks of it. Hashes are streamed in blocks and remembered per inode, size and
+modification time, so unchanged files and files already linked to the store are never hashed again.
+Files hardlinked to a stored object share its inode: replace such a file instead of rewriting it in place.
+
+Inputs:
+store_dir [string] = folder of the store (created if missing; has to be on the same filesystem as the campaigns)
+suffixes [tuple] = file endings stored (others are left alone)
+'''
+class ArtifactStore:
+
+    def __init__(self, store_dir, suffixes=(".stp", ".sgrd", ".sres")):
+        self.store_dir = store_dir
+        self.suffixes = suffixes
+        os.makedirs(os.path.join(store_dir, "objects"), exist_ok=True)
+        self.device = os.stat(store_dir).st_dev
+        self.warned = False
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(store_dir, "hashes.sqlite"), check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS hashes (device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, digest TEXT, PRIMARY KEY (device, inode))")
+
+    def object_path(self, digest):
+        return os.path.join(self.store_dir, "objects", digest[:2], digest)
+
+    '''
+    Hash of a file, reusing the stored hash of its inode if the file did not change since.
+    '''
+    def digest(self, path, st=None):
+
+        st = st or os.stat(path)
+        key = (st.st_dev, st.st_ino)
+        with self.lock:
+            row = self.connection.execute("SELECT size, mtime_ns, digest FROM hashes WHERE device = ? AND inode = ?", key).fetchone()
+        if row is not None and row[:2] == (st.st_size, st.st_mtime_ns):
+            return row[2]
+
+        digest = file_hash(path)
+        self.remember(path, digest)
+
+        return digest
+
+    def remember(self, path, digest):
+
+        st = os.stat(path)
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)", (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, digest))
+
+    '''
+    Links a file to a new path: reflink if possible, then hardlink, then a plain copy.
+    '''
+    def link(self, source, destination):
+
+        if clone_file(source, destination):
+            return
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+
+    '''
+    Adds a file to the store and replaces it by a link to the stored content.
+
+    Inputs:
+    path [string] = artifact file (e.g. inside a design folder)
+
+    Outputs:
+    saved [int] = bytes no longer stored twice (0 if the content was new or the file is on another filesystem)
+    '''
+    def ingest(self, path):
+
+        st = os.stat(path)
+        if st.st_dev != self.device:
+            if not self.warned:
+                print("Artifact store " + self.store_dir + " is on another filesystem than " + path + ", artifacts are not deduplicated")
+                self.warned = True
+            return 0
+
+        digest = self.digest(path, st)
+        stored = self.object_path(digest)
+
+        if not os.path.exists(stored):
+            os.makedirs(os.path.dirname(stored), exist_ok=True)
+            temp_file = os.path.join(self.store_dir, ".tmp_" + uuid.uuid4().hex)
+            self.link(path, temp_file)
+            os.replace(temp_file, stored)
+            self.remember(stored, digest)
+            return 0
+
+        if os.path.samefile(stored, path):
+            return 0
+
+        temp_file = path + ".tmp_" + uuid.uuid4().hex
+        self.link(stored, temp_file)
+        os.replace(temp_file, path)
+        with self.lock, self.connection:
+            # The replaced inode is gone (its number may be reused by another file):
+            self.connection.execute("DELETE FROM hashes WHERE device = ? AND inode = ?", (st.st_dev, st.st_ino))
+        self.remember(path, digest)
+
+        return st.st_size
+
+    def close(self):
+        self.connection.close()
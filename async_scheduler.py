@@ -0,0 +1,285 @@
+import asyncio
+import os
+import time
+from scheduler import POLL_INTERVAL, IncompleteRun, converged_status, finish, report
+
+'''
+Runs solver jobs (see scheduler.Job) as asyncio subprocesses from a single controller thread, so hundreds of
+concurrent jobs only cost one coroutine each. The stdout/stderr of every job is streamed to its own log file
+while it runs, and a job is stopped when it exceeds its wall-clock timeout (Job.timeout) or shows no progress
+(no output and no growth of Job.progress_file) for progress_timeout seconds. Ctrl+C (or cancel) stops all
+running processes and marks the unfinished jobs as cancelled.
+
+Inputs:
+log_dir [string] = folder of the job logs (<job name>.log, one section per attempt)
+progress_timeout [float] = seconds without progress before a job is stopped (None = no limit)
+poll_interval [float] = seconds between two timeout checks of a running job
+grace_period [float] = seconds a stopped process gets to exit before it is killed
+'''
+class AsyncOrchestrator:
+
+    def __init__(self, log_dir="logs", progress_timeout=None, poll_interval=1.0, grace_period=10.0):
+        self.log_dir = log_dir
+        self.progress_timeout = progress_timeout
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+        self.loop = None
+        self.main_task = None
+        self.cancelled = False
+
+    '''
+    Runs jobs as a dependency graph (same semantics as scheduler.run_dag; jobs without dependencies
+    simply run concurrently like scheduler.run_jobs).
+
+    Inputs:
+    jobs [list] = Job objects (dependencies have to be part of the list)
+    max_jobs [int] = maximum number of jobs running at the same time
+    license_caps [dict] = maximum number of concurrent jobs per tool (e.g. {"SimericsMP": 8})
+
+    Outputs:
+    jobs [list] = the same Job objects with status, returncode, attempts and duration filled in
+    '''
+    def run(self, jobs, max_jobs=1, license_caps=None):
+
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        try:
+            asyncio.run(self.run_dag(jobs, max_jobs, license_caps))
+        except asyncio.CancelledError:
+            self.mark_cancelled(jobs)
+        except KeyboardInterrupt:
+            self.mark_cancelled(jobs)
+            report(jobs)
+            raise
+
+        report(jobs)
+
+        return jobs
+
+    def mark_cancelled(self, jobs):
+
+        for job in jobs:
+            if job.status in ("pending", "running"):
+                job.status = "cancelled"
+
+    '''
+    Cancels all running and waiting jobs (may be called from another thread); run then returns.
+    '''
+    def cancel(self):
+
+        self.cancelled = True
+        if self.loop is not None and self.main_task is not None:
+            self.loop.call_soon_threadsafe(self.main_task.cancel)
+
+    async def run_dag(self, jobs, max_jobs, license_caps):
+
+        self.loop = asyncio.get_running_loop()
+        self.main_task = asyncio.current_task()
+        self.cancelled = False
+        self.slots = asyncio.Semaphore(max_jobs)
+        self.licenses = {tool: asyncio.Semaphore(cap) for tool, cap in (license_caps or {}).items()}
+
+        known = set(jobs)
+        missing = [job.name for job in jobs if any(dependency not in known for dependency in job.depends_on)]
+        if missing:
+            raise ValueError("Jobs with unresolvable dependencies: " + ", ".join(missing))
+
+        self.finished = {job: asyncio.Event() for job in jobs}
+        tasks = {job: asyncio.create_task(self.run_after(job)) for job in jobs}
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except asyncio.CancelledError:
+            # gather already passed the cancellation on to every task (and raises as soon as the first one is
+            # cancelled); cancelling them again would interrupt them while they stop their solvers:
+            self.cancelled = True
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    '''
+    Waits for the dependencies of a job, then runs it (jobs whose dependencies failed are skipped).
+    '''
+    async def run_after(self, job):
+
+        try:
+            for dependency in job.depends_on:
+                await self.finished[dependency].wait()
+
+            if any(dependency.status != "done" for dependency in job.depends_on):
+                job.status = "skipped"
+                return job
+
+            return await self.run_job(job)
+        finally:
+            self.finished[job].set()
+
+    '''
+    Runs a single job until it succeeds or runs out of retries.
+    '''
+    async def run_job(self, job):
+
+        semaphore = self.licenses.get(job.tool)
+
+        # A cancelled campaign never starts another attempt:
+        while job.attempts <= job.retries and not self.cancelled:
+            # The license is taken before the slot, so jobs waiting for a license leave the slots to other tools:
+            if semaphore is not None:
+                await semaphore.acquire()
+
+            try:
+                async with self.slots:
+                    job.attempts += 1
+                    job.status = "running"
+                    start = time.time()
+                    if job.started is None:
+                        job.started = start
+
+                    try:
+                        if job.on_start is not None:
+                            await asyncio.to_thread(job.on_start)
+                        if callable(job.command):
+                            await asyncio.to_thread(job.command)
+                            job.returncode = 0
+                            job.status = "done"
+                        else:
+                            job.status = await self.run_process(job, start)
+                    except asyncio.CancelledError:
+                        job.status = "cancelled"
+                        self.cancelled = True
+                        raise
+                    except IncompleteRun as error:
+                        print(job.name + " incomplete: " + str(error))
+                        job.status = "incomplete"
+                    except Exception as error:
+                        print(job.name + " failed: " + str(error))
+                        job.status = "failed"
+                    finally:
+                        job.duration += time.time() - start
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+            if job.status == "done":
+                finish(job)
+                break
+            if job.status == "incomplete":
+                break
+
+        return job
+
+    '''
+    Starts the solver process of a job, streams its output to the job log and watches it.
+
+    Outputs:
+    status [string] = done, failed, timeout, stalled or incomplete
+    '''
+    async def run_process(self, job, start):
+
+        with open(os.path.join(self.log_dir, job.name + ".log"), "ab") as log:
+            log.write(("=== attempt " + str(job.attempts) + ": " + " ".join(job.command) + "\n").encode())
+            log.flush()
+
+            process = await asyncio.create_subprocess_exec(*job.command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            job.pid = process.pid
+            progress = {"time": start}
+            streaming = asyncio.create_task(self.stream(process.stdout, log, progress))
+
+            try:
+                status = await self.watch(process, job, start, progress)
+            except asyncio.CancelledError:
+                await self.stop(process)
+                streaming.cancel()
+                log.write(b"=== cancelled\n")
+                raise
+
+            try:
+                await asyncio.wait_for(streaming, self.grace_period)
+            except asyncio.TimeoutError:
+                # The output is still held open by a child process of the solver:
+                streaming.cancel()
+            log.write(("=== " + status + " (exit status " + str(job.returncode) + ")\n").encode())
+
+        return status
+
+    async def stream(self, output, log, progress):
+
+        while True:
+            chunk = await output.read(65536)
+            if not chunk:
+                break
+            log.write(chunk)
+            log.flush()
+            progress["time"] = time.time()
+
+    '''
+    Waits for a solver process, enforcing the wall-clock and no-progress timeouts and polling the job's monitor.
+    '''
+    async def watch(self, process, job, start, progress):
+
+        waiting = asyncio.ensure_future(process.wait())
+        progress_size = None
+        last_check = start
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiting}, timeout=self.poll_interval)
+                if done:
+                    job.returncode = waiting.result()
+                    return "done" if job.returncode == 0 else "failed"
+
+                now = time.time()
+                if job.progress_file is not None and os.path.exists(job.progress_file):
+                    size = os.path.getsize(job.progress_file)
+                    if size != progress_size:
+                        progress_size = size
+                        progress["time"] = now
+
+                if job.timeout is not None and now - start >= job.timeout:
+                    job.returncode = await self.stop(process)
+                    return "timeout"
+
+                if self.progress_timeout is not None and now - progress["time"] >= self.progress_timeout:
+                    print(job.name + " made no progress for " + str(self.progress_timeout) + " s")
+                    job.returncode = await self.stop(process)
+                    return "stalled"
+
+                if job.monitor is not None and now - last_check >= POLL_INTERVAL:
+                    last_check = now
+                    try:
+                        converged = await asyncio.to_thread(job.monitor)
+                    except Exception:
+                        # Otherwise the solver keeps running next to the retry of the job:
+                        job.returncode = await self.stop(process)
+                        raise
+                    if converged:
+                        job.returncode = await self.stop(process)
+                        return converged_status(job, start)
+        finally:
+            waiting.cancel()
+
+    '''
+    Stops a process (terminate, then kill after the grace period).
+
+    Outputs:
+    returncode [int] = exit status of the process
+    '''
+    async def stop(self, process):
+
+        if process.returncode is not None:
+            return process.returncode
+
+        try:
+            process.terminate()
+            return await asyncio.wait_for(process.wait(), self.grace_period)
+        except ProcessLookupError:
+            return await process.wait()
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                # The process exited meanwhile
+                pass
+            returncode = await process.wait()
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            return returncode
@@ -0,0 +1,249 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+'''
+Benchmark suite of the pre- and post-processing stages. Synthetic CFturbo exports, multi-stage .spro files and
+integrals files are generated at several scales in a temporary folder, every stage is timed with its peak
+Python memory (tracemalloc), and the results are appended to benchmark_results.jsonl together with the git
+revision, so runs of different versions can be compared. CFturbo and SimericsMP are never called.
+
+Usage: python benchmark.py [--scales 10 100 1000] [--output benchmark_results.jsonl]
+'''
+
+'''
+Imports the main script (its file name is not a valid module name).
+'''
+def load_pipeline():
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cft-batch_to_simerics.py")
+    spec = importlib.util.spec_from_file_location("cft_batch_to_simerics", script)
+    pipeline = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline)
+
+    return pipeline
+
+'''
+Writes a synthetic CFturbo batch export.
+
+Inputs:
+cft_batch_file [string] = name of the .cft-batch file
+num_components [int] = number of exported components
+num_variables [int] = number of variables per component (cycling through Double, Integer, Array [rad] and Vector [m])
+'''
+def synthetic_cft_batch(cft_batch_file, num_components, num_variables):
+
+    lines = ["<?xml version=\"1.0\" encoding=\"utf-8\"?>\n", "<CFturboFile Version=\"2021.2.0\">\n",
+             "\t<CFturboBatchProject InputFile=\"Synthetic.cft\">\n", "\t\t<Updates>\n",
+             "\t\t\t<CFturboProject Type=\"Project\">\n", "\t\t\t\t<CFturboDesign Type=\"Design\">\n"]
+
+    for component in range(num_components):
+        name = "Impeller [" + str(component + 1) + "]"
+        lines.append("\t\t\t\t\t<Impeller Type=\"Impeller\" Name=\"" + name + "\">\n")
+        for variable in range(num_variables):
+            key = "v" + str(component) + "_" + str(variable)
+            kind = variable % 4
+            if kind == 0:
+                lines.append("\t\t\t\t\t\t<" + key + " Type=\"Double\" Caption=\"" + key + "\" Desc=\"Length\" Unit=\"m\">" + str(0.1 + 0.001*variable) + "</" + key + ">\n")
+            elif kind == 1:
+                lines.append("\t\t\t\t\t\t<" + key + " Type=\"Integer\" Caption=\"" + key + "\" Desc=\"Count\">" + str(5 + variable % 3) + "</" + key + ">\n")
+            elif kind == 2:
+                lines.append("\t\t\t\t\t\t<" + key + " Type=\"Array\" Count=\"3\" Caption=\"" + key + "\" Desc=\"Angles\" Unit=\"rad\">\n")
+                for index in range(3):
+                    lines.append("\t\t\t\t\t\t\t<Value Index=\"" + str(index) + "\" Type=\"Double\">" + str(0.3 + 0.05*index) + "</Value>\n")
+                lines.append("\t\t\t\t\t\t</" + key + ">\n")
+            else:
+                lines.append("\t\t\t\t\t\t<" + key + " Type=\"Vector\" Count=\"2\" Caption=\"" + key + "\" Desc=\"Point\" Unit=\"m\">\n")
+                lines.append("\t\t\t\t\t\t\t<X Type=\"Double\">0.01</X>\n")
+                lines.append("\t\t\t\t\t\t\t<Y Type=\"Double\">0.02</Y>\n")
+                lines.append("\t\t\t\t\t\t</" + key + ">\n")
+        lines.append("\t\t\t\t\t</Impeller>\n")
+
+    lines += ["\t\t\t\t</CFturboDesign>\n", "\t\t\t</CFturboProject>\n", "\t\t</Updates>\n",
+              "\t\t<BatchAction Name=\"Export\" WorkingDir=\".\\\">\n", "\t\t\t<ExportInterface Type=\"Simerics\">x</ExportInterface>\n",
+              "\t\t\t<ExportComponents Count=\"" + str(num_components) + "\">\n"]
+    lines += ["\t\t\t\t<Component Index=\"" + str(component) + "\" Name=\"Impeller [" + str(component + 1) + "]\"/>\n" for component in range(num_components)]
+    lines += ["\t\t\t</ExportComponents>\n", "\t\t\t<BaseFileName>Synthetic_steady</BaseFileName>\n", "\t\t</BatchAction>\n",
+              "\t</CFturboBatchProject>\n", "</CFturboFile>\n"]
+
+    with open(cft_batch_file, "w") as outfile:
+        outfile.writelines(lines)
+
+'''
+Writes a synthetic multi-stage Simerics project.
+
+Inputs:
+spro_file [string] = name of the .spro file
+num_stages [int] = number of rotating components (one MGI between two neighbouring components, at most 9 impellers)
+'''
+def synthetic_spro(spro_file, num_stages):
+
+    design = os.path.basename(spro_file).split(".")[0]
+    lines = ["<project>\n", "  <grid file=\"" + design + ".sgrd\"/>\n"]
+    for stage in range(1, num_stages + 1):
+        lines += ["  <mgi name=\"MGI" + str(stage) + "\">\n", "    <side1 patch=\"Comp" + str(stage) + "-Out\"/>\n",
+                  "    <side2 patch=\"Comp" + str(stage + 1) + "-In\"/>\n", "  </mgi>\n"]
+    lines += ["  <interface patch=\"MGI" + str(stage) + "\"/>\n" for stage in range(1, num_stages + 1)]
+
+    lines += ["  <expressions>\n", "    vflow_out = 1.25\n", "    Omega1 = 837.758\n", "    #Outlet volumetric flux [m3/s]\n",
+              "    #delta p [Pa]\n", "    plot.DPtt = flow.mpt@\"Outlet\" - flow.mpt@\"Inlet\"\n", "    #plot.DPtt:delta p (t-t) [Pa]\n",
+              "    #efficiency [-]\n", "    plot.Eff_tt = flow.q@\"Outlet\"*plot.DPtt/rho/plot.PC1\n", "    #plot.Eff_tt:efficiency (t-t) [-]\n"]
+    for impeller in range(1, min(num_stages, 9) + 1):
+        lines += ["    #power [W]\n", "    plot.PC" + str(impeller) + " = abs(flow.power@\"Comp" + str(impeller) + "-Hub\" + flow.power@\"Comp" + str(impeller) + "-Blade\")\n",
+                  "    #plot.PC" + str(impeller) + ":power, imp" + str(impeller) + " [W]\n"]
+    lines += ["  </expressions>\n", "</project>\n"]
+
+    with open(spro_file, "w") as outfile:
+        outfile.writelines(lines)
+
+'''
+Writes a synthetic Simerics integrals file with the columns post_process expects.
+
+Inputs:
+integral_file [string] = name of the _integrals.txt file
+num_rows [int] = number of iterations
+num_extra [int] = number of additional user defined expressions
+'''
+def synthetic_integrals(integral_file, num_rows, num_extra=10):
+
+    names = ["DPtt", "DPtt1", "Eff_tt", "Eff_tt_1", "PC1", "Torque1", "H", "H1", "DPtt_stage", "Eff_tt_stage"] + ["X" + str(extra) for extra in range(num_extra)]
+    iterations = np.arange(num_rows)
+    values = 1000 + np.arange(len(names))[np.newaxis, :] + 5*np.sin(iterations[:, np.newaxis]*0.1)
+
+    with open(integral_file, "w") as outfile:
+        outfile.write("iter\ttime\t" + "\t".join("userdef." + name for name in names) + "\n")
+        np.savetxt(outfile, np.column_stack((iterations, iterations*1e-4, values)), delimiter="\t", fmt="%.6g")
+
+'''
+Times one call and measures its peak Python memory.
+
+Outputs:
+seconds [float], peak_mb [float] = wall time and tracemalloc peak of the call
+'''
+def measure(function, *args, **kwargs):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return seconds, peak/1024**2
+
+'''
+Runs every stage at one scale (number of designs) in the current (temporary) folder.
+
+Outputs:
+results [list] = one dict per stage (stage, scale, seconds, peak_mb)
+'''
+def run_scale(pipeline, scale):
+
+    results = []
+
+    def record(stage, function, *args, **kwargs):
+        seconds, peak_mb = measure(function, *args, **kwargs)
+        results.append({"stage": stage, "scale": scale, "seconds": seconds, "peak_mb": peak_mb})
+        print(stage.ljust(26) + str(scale).rjust(8) + ("%.3f s" % seconds).rjust(12) + ("%.1f MB" % peak_mb).rjust(12))
+
+    num_components = max(1, int(math.log10(scale)) + 1)
+    synthetic_cft_batch("Synthetic_steady.cft-batch", num_components, 12)
+    cft_batch = pipeline.parse_cft_batch("Synthetic_steady.cft-batch")
+    record("make_template", pipeline.make_template, cft_batch, "template_steady.cft-batch")
+
+    variables, units, components, template = pipeline.make_template(cft_batch, "template_steady.cft-batch")
+    original = np.array(template.original_values, dtype=np.float64)
+    rad = np.array(units) == "rad"
+    original[rad] = np.degrees(original[rad])
+    values_array = original[:, np.newaxis]*np.linspace(0.95, 1.05, scale)[np.newaxis, :]
+    record("make_variations", pipeline.make_variations, template, units, values_array, "Design")
+
+    spro_files = []
+    for design in range(scale + 1):
+        spro = "Design" + str(design) + "_steady.spro"
+        synthetic_spro(spro, 4)
+        synthetic_integrals("Design" + str(design) + "_steady_integrals.txt", 2000)
+        spro_files.append(spro)
+        for suffix in [".stp", ".sgrd", ".sres"]:
+            open("Design" + str(design) + "_steady" + suffix, "w").close()
+
+    record("modify_spro", pipeline.modify_spro, spro_files[0], [1, 2])
+    record("modify_spro_files", pipeline.modify_spro_files, spro_files[1:], [1, 2], 1)
+    record("post_process", pipeline.post_process, spro_files, "Design", 100, 120)
+
+    store = pipeline.ResultsStore("Synthetic_results")
+
+    def post_process_designs():
+        # One call (and one store part) per design, like the post-processing jobs of run_pipeline:
+        for design, spro in enumerate(spro_files):
+            pipeline.post_process([spro], "Design", 100, 120, [design], store)
+
+    record("post_process_per_design", post_process_designs)
+    record("compact_results", pipeline.compact_results, "steady")
+    record("results_store_compact", store.compact)
+
+    variations = ["Design" + str(design) + "_steady.cft-batch" for design in range(scale + 1)]
+    record("organize_file_structure", pipeline.organize_file_structure, variations, "Design")
+
+    return results
+
+'''
+Prints the change of every stage relative to the last earlier run with the same stage and scale.
+'''
+def compare(results, output):
+
+    previous = {}
+    if os.path.exists(output):
+        with open(output, "r") as infile:
+            for line in infile:
+                run = json.loads(line)
+                previous[(run["stage"], run["scale"])] = run
+
+    for result in results:
+        earlier = previous.get((result["stage"], result["scale"]))
+        if earlier is not None and earlier["seconds"] > 0:
+            print(result["stage"].ljust(26) + str(result["scale"]).rjust(8) + ("%+.0f %%" % (100*(result["seconds"]/earlier["seconds"] - 1))).rjust(12)
+                  + " vs " + str(earlier.get("revision")))
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmarks the pre- and post-processing stages on synthetic inputs.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = None
+
+    pipeline = load_pipeline()
+    parent_path = os.getcwd()
+    results = []
+
+    for scale in args.scales:
+        work_dir = tempfile.mkdtemp(prefix="benchmark_")
+        os.chdir(work_dir)
+        try:
+            results += run_scale(pipeline, scale)
+        finally:
+            os.chdir(parent_path)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    compare(results, output)
+
+    with open(output, "a") as outfile:
+        for result in results:
+            outfile.write(json.dumps(dict(result, revision=revision, time=time.time())) + "\n")
+
+if __name__ == "__main__":
+    main()
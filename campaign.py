@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+
+'''
+Stages every design passes through, in order.
+'''
+STAGES = ["rendered", "geometry", "modified", "solved", "post_processed", "organized"]
+
+'''
+Persistent per-design manifest of a campaign (SQLite), used to resume a campaign after it was interrupted.
+Every design/solver type is registered with the key of its rendered parameters (see result_cache.design_key);
+if the key changed since the last run (new DOE values or solver settings), its recorded stages are reset.
+
+Inputs:
+db_file [string] = name of the SQLite manifest file (created if missing)
+'''
+class Manifest:
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS designs (design INTEGER, solver_type TEXT, key TEXT, PRIMARY KEY (design, solver_type))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS stages (design INTEGER, solver_type TEXT, stage TEXT, finished REAL, PRIMARY KEY (design, solver_type, stage))")
+
+    '''
+    Registers a design and resets its stages if its key changed.
+    '''
+    def register(self, design, solver_type, key):
+
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT key FROM designs WHERE design = ? AND solver_type = ?", (design, solver_type)).fetchone()
+            if row is not None and row[0] == key:
+                return
+            self.connection.execute("DELETE FROM stages WHERE design = ? AND solver_type = ?", (design, solver_type))
+            self.connection.execute("INSERT OR REPLACE INTO designs VALUES (?, ?, ?)", (design, solver_type, key))
+
+    '''
+    Records that a stage of a design has finished.
+    '''
+    def mark(self, design, solver_type, stage):
+
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)", (design, solver_type, stage, time.time()))
+
+    '''
+    Checks whether a stage of a design has finished.
+    '''
+    def is_done(self, design, solver_type, stage):
+
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM stages WHERE design = ? AND solver_type = ? AND stage = ?", (design, solver_type, stage)).fetchone()
+
+        return row is not None
+
+    '''
+    Prints the number of designs that finished each stage.
+    '''
+    def summary(self):
+
+        with self.lock:
+            rows = self.connection.execute("SELECT solver_type, stage, COUNT(*) FROM stages GROUP BY solver_type, stage").fetchall()
+
+        counts = {(solver_type, stage): count for solver_type, stage, count in rows}
+        for solver_type in sorted(set(solver_type for solver_type, stage in counts)):
+            print(solver_type + ": " + ", ".join(stage + " " + str(counts.get((solver_type, stage), 0)) for stage in STAGES))
+
+    def close(self):
+        self.connection.close()
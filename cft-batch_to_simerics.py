@@ -1,263 +1,179 @@
-from audioop import avgpp
 from genericpath import isdir
 import shutil
 import numpy as np
 import re
 import csv
 import os
-import subprocess
-from math import radians
+import errno
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 import pandas as pd
-from modify_spro import *                                                       
+from modify_spro import *
+from cft_batch import *
+from scheduler import *
+from integrals import *
+from result_cache import *
+from campaign import *
+from doe import *
+from sampling import *
+from surrogate import *
+from results_store import *
+from results_index import *
+from async_scheduler import *
+from work_queue import *
+from tracing import *
+from transient import *
+from warm_start import *
+from artifact_store import *
 
 '''
 Takes .txt file filled with parameter values and converts it into a numpy array (column vector is one geometry variation).
-Dimensions should be in [m] and angles should be in [deg].
+Dimensions should be in [m] and angles should be in [deg]. See load_doe for the supported layouts.
 
 Inputs:
 txt_file [string] = name of .txt file containing geometry variation parameters
 delimeter [string] = delimiter used within .txt file
+variables [list] = variable names returned by make_template (only used if the file names its variables)
+designs_as_rows [bool] = True if the file has a header line and one line per design
 
 Outputs:
-values_array [np.array] = np.array of geometry parameter values
+values_array [np.array] = float64 array of geometry parameter values
 '''
-def txt_to_np(txt_file, delimiter):
+def txt_to_np(txt_file, delimiter, variables=None, designs_as_rows=False):
 
-    array = []
-
-    with open(txt_file) as txt:
-        data = txt.readlines()
-        for line in data:
-            array.append(line.split(delimiter))
-
-    values_array = np.array(array, dtype=object)
+    values_array = load_doe(txt_file, delimiter, variables, designs_as_rows)
 
     return values_array
 
 
 '''
-Takes original .cft-batch file and creates a blank .cft-batch template for parameter manipulation.
+Takes the parsed original .cft-batch file and creates a blank .cft-batch template for parameter manipulation.
 
 Inputs:
-cft_batch_file [string] = name of original .cft-batch file exported from CFturbo software
+cft_batch [CftBatch] = parsed .cft-batch file exported from CFturbo software (see parse_cft_batch)
 template_file [string] = name of output .cft-batch template 
 
 Outputs:
 variables [list] = variable names associated with the manipulated geometry parameters
 units [list] = variable units associated with the manipulated geometry parameters
 components [list] = component names listed within the .cft-batch file
+template [CftTemplate] = compiled template used to render the geometry variations
 '''
-def make_template(cft_batch_file, template_file):
-
-    components = []
-    formatted_components = []
+def make_template(cft_batch, template_file):
 
-    with open(cft_batch_file, "r") as cft_batch:
-        data = cft_batch.readlines()
-        for line_number, line in enumerate(data):
-            if "ExportComponents " in line:
-                num_components = int(line.split("\"")[1])
+    template = cft_batch.compile()
+    template.write(template_file)
 
-                for index in range(1, num_components + 1):
-                    component = data[line_number + index].split("\"")[3]
-                    components.append(component)
-                    
-                    if "[" in component:
-                        component = component.replace("[", " ").strip()
-                    
-                    if "]" in component:
-                        component = component.replace("]", " ").strip()
-
-                    formatted_components.append(component)
-    
-        cft_batch.close()
-
-    variables = []
-
-    with open(cft_batch_file, "r") as cft_batch:
-        data = cft_batch.readlines()
-        for line_number, line in enumerate(data):
-            if "Type=" in line and "</" in line and "ExportInterface" not in line and bool(set(line.split("\"")) & set(components)) == False:
-                value = re.search(">(.*)</", line).group(1)
-                variable = re.search("</(.*)>", line).group(1)
-                newline = line.replace(value, "{" + variable + "}")
-                data[line_number] = newline
-                variables.append(variable)
-
-            if "ExportComponents " in line:
-                for index in range(0, num_components):
-                    newline = data[line_number + index + 1].replace(components[index], formatted_components[index])
-                    data[line_number + index + 1] = newline
-                break
-
-        cft_batch.close()
-    
-    with open(template_file, "w") as template:
-        template.writelines(data)
-        template.close()
-
-    units = []
-
-    with open(cft_batch_file, "r") as cft_batch:
-        data = cft_batch.readlines()
-        for line_number, line in enumerate(data):
-            if "Caption=" in line and "Desc=" in line:
-                if "Array" in line:
-                    unit = re.search("Unit=\"(.*)\"", line).group(1)
-
-                    var = line.split(" ")[0].lstrip()[1:]
-                    key = "</" + var + ">"
-            
-                    count = 0
-                    while True:
-                        if key in data[(line_number + 1) + count]:
-                            break
-                        count += 1
-
-                    units += [unit] * count 
-
-                elif "Vector" in line:
-                    count = int(re.search("([\d])", line).group(1))
-                    unit = re.search("Unit=\"(.*)\"", line).group(1)
-                    units += [unit] * count 
-
-                elif "Unit" not in line:
-                    unit = "-"
-                    units.append(unit)
-
-                else:
-                    unit = re.search("Unit=\"(.*)\"", line).group(1)
-                    units.append(unit)
-        
-        cft_batch.close()
-       
-    return variables, units, components
+    return cft_batch.variables, cft_batch.units, cft_batch.components, template
 
 '''
 Assigns geometry variation parameters to new .cft-batch files.
 
 Inputs:
-cft_batch_file [string] = name of original .cft-batch file exported from CFturbo software
-template_file [string] = name of output .cft-batch template 
-variables [list] = variable names associated with the manipulated geometry parameters
+template [CftTemplate] = compiled template returned by make_template
 units [list] = variable units associated with the manipulated geometry parameters
-components [list] = component names listed within the .cft-batch file
-values_array [np.array] = np.array of geometry parameter values
+values_array [np.array] = np.array of geometry parameter values (or an iterable of blocks, e.g. from iter_doe);
+                         NaN values keep the value of the original .cft-batch file (e.g. text options)
 base_name [string] = base name of folder containing .stp files
 
 Outputs:
 variations [list] = list of variation file names
 '''
-def make_variations(cft_batch_file, template_file, variables, units, components, values_array, base_name):
-
-    original_values = [[] for i in range(len(units))]
-
-    with open(cft_batch_file, "r") as cft_batch:
-        data = cft_batch.readlines()
-        count = 0
-        for line_number, line in enumerate(data):
-            if "Type=" in line and "</" in line and "ExportInterface" not in line and bool(set(line.split("\"")) & set(components)) == False:
-                value = re.search(">(.*)</", line).group(1)
-                original_values[count] = [value]
-                count += 1
-
-    original_values = np.array(original_values)
-
-    variations = []
-
-    entire_values_array = np.hstack((original_values, values_array))
-
-    for i, column in enumerate(entire_values_array.T):
-
-        with open(template_file, "r") as template:
-            data = template.readlines()
-
-            for j, value in enumerate(column):
-
-                if units[j] == "rad" and i != 0:
-                    value = str(radians(float(value)))
+def make_variations(template, units, values_array, base_name):
 
-                key = "{" + variables[j] + "}"
-                 
-                for line_number, line in enumerate(data):
-                    if key in line:
-                        data[line_number] = line.replace(key, value)
-                        break
+    original_values = np.array(template.original_values, dtype=object).reshape(-1, 1)
+    variations = template.render_all(original_values, base_name)
 
-            for line_number, line in enumerate(data):
-                '''
-                if "<WorkingDir>" in line:
-                    old_directory = re.search("<WorkingDir>(.*)</WorkingDir>", line).group(1)
-                    new_directory = ".\\" + output_folder + "\\"
-                    data[line_number] = line.replace(old_directory, new_directory)
-                '''
+    if isinstance(values_array, np.ndarray):
+        values_array = [values_array]
 
-                if "<BaseFileName>" in line:
-                    old_name = re.search("<BaseFileName>(.*)</BaseFileName>", line).group(1)
-                    solver_type = old_name.split("_")[-1]
-                    data[line_number] = line.replace(old_name, base_name + str(i) + "_" + solver_type)
-
-            new_file = base_name + str(i) + "_" + solver_type + ".cft-batch"
-
-            with open(new_file, "w+") as new:
-                new.writelines(data)
-                new.close()
-
-            template.close()
-
-        variations.append(new_file)
+    for block in values_array:
+        formatted_values = np.where(np.isnan(block), original_values, format_values(to_radians(block, units)))
+        variations += template.render_all(formatted_values, base_name, first_index=len(variations))
 
     return variations
 
 
 '''
-Places each variation into a .bat file then runs .bat file to create respective .cft variations.
+Places each variation into a .bat file (for manual reruns) then runs the CFturbo jobs concurrently to create respective .cft variations.
 
 Inputs:
 cft_batch_file [string] = output .bat file (CFturbo)
 variations [list] = variation file names
+max_jobs [int] = maximum number of solver jobs running at the same time
+license_caps [dict] = maximum number of concurrent jobs per tool (e.g. {"CFturbo": 4, "SimericsMP": 8})
+timeout [float] = seconds before a single run is killed (None = no limit)
+retries [int] = number of reruns after a failed run
+orchestrator [AsyncOrchestrator] = runs the jobs as asyncio subprocesses with per-job logs and progress timeouts (None = thread scheduler)
+tracer [Tracer] = records the wall time, CPU time and peak RSS of every job (None = no tracing)
 '''
-def make_batch(cft_bat_file, variations):
+def make_batch(cft_bat_file, variations, max_jobs=1, license_caps=None, timeout=None, retries=0, orchestrator=None, tracer=None):
     
     with open(cft_bat_file, "a+") as batch:
         for index, variation in enumerate(variations):
             if index == 0:
                 batch.truncate(0)
 
-            batch.write("\"C:\Program Files\CFturbo 2021.2.0\CFturbo.exe\" -batch \"" + variation + "\"\n")
+            batch.write("\"" + CFTURBO_EXE + "\" -batch \"" + variation + "\"\n")
 
         batch.close()
 
-    batch_path = os.path.abspath(cft_bat_file)
     spro_path = os.path.abspath(variations[0].split("_")[0])
     if not os.path.exists(spro_path):
-        subprocess.call(batch_path)
+        jobs = [cfturbo_job(variation, timeout, retries) for variation in variations]
+        schedule(jobs, max_jobs, license_caps, orchestrator, tracer)
 
     return 0
 
+'''
+Runs jobs with the orchestrator (or the thread scheduler) and traces them.
+
+Inputs:
+jobs [list] = Job objects
+max_jobs, license_caps, orchestrator, tracer = scheduler settings (see make_batch)
+dependencies [bool] = whether the jobs form a dependency graph (run_dag) or are independent (run_jobs)
+'''
+def schedule(jobs, max_jobs=1, license_caps=None, orchestrator=None, tracer=None, dependencies=False):
+
+    with nullcontext() if tracer is None else tracer.watch(jobs):
+        if orchestrator is not None:
+            orchestrator.run(jobs, max_jobs, license_caps)
+        elif dependencies == True:
+            run_dag(jobs, max_jobs, license_caps)
+        else:
+            run_jobs(jobs, max_jobs, license_caps)
+
+    return jobs
+
 '''
 Asks the user to input the integer numbers associated with the starting and ending stage components.
 Modifies the .spro files to include relevant user expressions for post-processing.
-Places each variation into a .bat file then runs .bat file using Simerics.
+Places each variation into a .bat file (for manual reruns) then runs the SimericsMP jobs concurrently.
 
 Inputs:
 simerics_batch_file [string] = name of output .bat file (Simerics)
 output_folder [string] = name of output folder containing the resulting geometry variations
 base_name [string] = base name of folder containing .stp files
+max_jobs, license_caps, timeout, retries, orchestrator, tracer = scheduler settings (see make_batch)
+convergence_criteria [dict] = expression name -> relative tolerance; steady runs are stopped once all are met (None = run to the end)
+convergence_window [int] = number of iterations compared by the convergence criteria
+modify_workers [int] = number of processes modifying the .spro files (None = one per CPU); files that fail are reported and not run
+warm_start [WarmStart] = steady runs start from the .sres of the nearest design solved before them (None = cold starts)
 
 Outputs:
 spro_files [list] = .spro files
 '''
-def run_simerics_batch(run_transient, simerics_batch_file, base_name):
+def run_simerics_batch(run_transient, simerics_batch_file, base_name, max_jobs=1, license_caps=None, timeout=None, retries=0, convergence_criteria=None, convergence_window=50, modify_workers=None, orchestrator=None, tracer=None, warm_start=None):
 
     spro_steady_files = []
     spro_transient_files = []
     parent_path = os.getcwd()
 
     for file in os.listdir(parent_path):
-        if ".spro" in file and "steady" in file:
+        if file.endswith(".spro") and "steady" in file:
             spro_steady_files.append(file)
-        if ".spro" in file and "transient" in file:
+        if file.endswith(".spro") and "transient" in file:
             spro_transient_files.append(file)
         
     spro_steady_files = sorted(spro_steady_files, key=lambda file: int(re.search(base_name + "(\d+)", file).group(1)))
@@ -269,39 +185,28 @@ def run_simerics_batch(run_transient, simerics_batch_file, base_name):
 
     if not os.path.exists(base_name + "0"):
 
-        for spro in spro_steady_files:
-            modify_spro(spro, stage_components)
-
-            with open(simerics_batch_file, "a+") as batch:
-                for index, spro in enumerate(spro_steady_files):
-                    if index == 0:
-                        batch.truncate(0)
-                    
-                    batch.write("\"C:\Program Files\Simerics\SimericsMP.exe\" -run \"" + spro + "\"\n")
+        failed = modify_spro_files(spro_steady_files, stage_components, modify_workers)
+        spro_steady_files = [spro for spro in spro_steady_files if spro not in failed]
+        write_simerics_batch(simerics_batch_file, spro_steady_files)
 
-                batch.close()
-
-        batch_path = os.path.abspath(simerics_batch_file)
-        subprocess.call(batch_path)
+        jobs = [simerics_job(spro, None, timeout, retries, convergence_criteria, convergence_window) for spro in spro_steady_files]
+        if warm_start is not None:
+            for spro, solve in zip(spro_steady_files, jobs):
+                warm_start.add(spro, spro.replace(".spro", ".cft-batch"), solve)
+                solve.on_start = partial(warm_start.prepare, spro, solve)
+        schedule(jobs, max_jobs, license_caps, orchestrator, tracer)
 
     if run_transient == True and not os.path.exists(base_name + "0"):
 
         print(base_name + "0")
 
-        for spro in spro_transient_files:
-            modify_spro(spro, stage_components)
-
-            with open(simerics_batch_file, "a+") as batch:
-                for index, spro in enumerate(spro_transient_files):
-                    if index == 0:
-                        batch.truncate(0)
+        failed = modify_spro_files(spro_transient_files, stage_components, modify_workers)
+        steady_sres = {spro.replace("_steady", "_transient"): spro.replace(".spro", ".sres") for spro in spro_steady_files}
+        spro_transient_files = [spro for spro in spro_transient_files if spro not in failed and spro in steady_sres]
+        write_simerics_batch(simerics_batch_file, spro_transient_files, [steady_sres[spro] for spro in spro_transient_files])
 
-                    batch.write("\"C:\Program Files\Simerics\SimericsMP.exe\" -run \"" + spro + "\" " + "\"" + spro_steady_files[index].replace(".spro", ".sres") + "\"\n")
-                    
-                batch.close()
-
-        batch_path = os.path.abspath(simerics_batch_file)
-        subprocess.call(batch_path)
+        jobs = [simerics_job(spro, steady_sres[spro], timeout, retries) for spro in spro_transient_files]
+        schedule(jobs, max_jobs, license_caps, orchestrator, tracer)
 
         return spro_steady_files + spro_transient_files
 
@@ -314,148 +219,512 @@ def run_simerics_batch(run_transient, simerics_batch_file, base_name):
         return spro_steady_files
 
 '''
-Averages the each .sres file results and places the values in .csv file.
+Writes the Simerics launch list of a set of .spro files (for manual reruns) in one go.
+
+Inputs:
+simerics_batch_file [string] = name of output .bat file (Simerics)
+spro_files [list] = .spro files
+sres_files [list] = initial solution of each .spro file (None = no initial solutions)
+'''
+def write_simerics_batch(simerics_batch_file, spro_files, sres_files=None):
+
+    with open(simerics_batch_file, "w") as batch:
+        for index, spro in enumerate(spro_files):
+            if sres_files is None:
+                batch.write("\"" + SIMERICS_EXE + "\" -run \"" + spro + "\"\n")
+            else:
+                batch.write("\"" + SIMERICS_EXE + "\" -run \"" + spro + "\" " + "\"" + sres_files[index] + "\"\n")
+
+'''
+Runs every design as its own dependency chain: CFturbo -> .spro modification -> steady solve ->
+transient solve (from the design's own steady .sres) -> post-processing. Each design advances as soon
+as its own previous step is done, so early transient runs overlap later steady runs and result rows
+are appended as designs finish.
+
+Inputs:
+run_transient [bool] = whether the transient variations are solved as well
+variations [list] = variation file names (steady variations first, as returned by make_variations)
+base_name [string] = base name of folder containing .stp files
+steady_avg_window, transient_avg_window [int] = averaging windows (see post_process)
+max_jobs, license_caps, timeout, retries, orchestrator, tracer = scheduler settings (see make_batch)
+convergence_criteria, convergence_window = early stopping of the steady runs (see run_simerics_batch)
+cache [ResultCache] = designs found in the cache are restored instead of built and solved; newly solved designs are stored (None = no cache)
+manifest [Manifest] = campaign manifest; stages finished in an earlier run are skipped and result rows are upserted (None = start from scratch)
+stage_components [list] = numbers of the initial and final stage component (None = ask for them)
+store [ResultsStore] = results store the post-processed rows are appended to (None = .csv files only)
+analysis [RevolutionAnalysis] = revolution-locked post-processing of the transient runs (see post_process)
+warm_start [WarmStart] = steady runs start from the .sres of the nearest design solved before them (None = cold starts)
+
+Outputs:
+spro_files [list] = .spro files
+'''
+def run_pipeline(run_transient, variations, base_name, steady_avg_window, transient_avg_window, max_jobs=1, license_caps=None, timeout=None, retries=0, convergence_criteria=None, convergence_window=50, cache=None, manifest=None, stage_components=None, store=None, orchestrator=None, tracer=None, analysis=None, warm_start=None):
+
+    if stage_components is None:
+        stage_components = []
+        stage_components.append(int(input("Enter the number associated with the initial stage component: ")))
+        stage_components.append(int(input("Enter the number associated with the final stage component: ")))
+
+    license_caps = dict(license_caps or {})
+    license_caps["post_process"] = 1
+
+    for solver_type in ["steady", "transient"]:
+        for output_file in ["results_" + solver_type + ".csv", "statistics_" + solver_type + ".csv"]:
+            if os.path.exists(output_file) and manifest is None:
+                os.remove(output_file)
+
+    steady_variations = [variation for variation in variations if variation.endswith("_steady.cft-batch")]
+    transient_variations = {variation.replace("_transient", "_steady"): variation for variation in variations if variation.endswith("_transient.cft-batch")}
+
+    settings = {"stage_components": stage_components, "cfturbo": CFTURBO_EXE, "simerics": SIMERICS_EXE, "convergence_criteria": convergence_criteria, "convergence_window": convergence_window}
+
+    jobs = []
+    spro_steady_files = []
+    spro_transient_files = []
+
+    for index, steady_variation in enumerate(steady_variations):
+        spro_steady = steady_variation.replace(".cft-batch", ".spro")
+        spro_steady_files.append(spro_steady)
+
+        steady_key = design_key(steady_variation, dict(settings, solver_type="steady"))
+        chain = solver_chain(steady_variation, stage_components, None, timeout, retries, convergence_criteria, convergence_window, cache, steady_key, manifest, index, warm_start)
+        if warm_start is not None:
+            warm_start.add(spro_steady, steady_variation, chain[-1])
+        jobs += chain + post_process_job(chain[-1], spro_steady, base_name, steady_avg_window, transient_avg_window, manifest, index, store, analysis)
+
+        if run_transient == True and steady_variation in transient_variations:
+            spro_transient = transient_variations[steady_variation].replace(".cft-batch", ".spro")
+            spro_transient_files.append(spro_transient)
+
+            transient_key = design_key(transient_variations[steady_variation], dict(settings, solver_type="transient", initial=steady_key))
+            transient_chain = solver_chain(transient_variations[steady_variation], stage_components, chain[-1], timeout, retries, None, convergence_window, cache, transient_key, manifest, index)
+            jobs += transient_chain + post_process_job(transient_chain[-1], spro_transient, base_name, steady_avg_window, transient_avg_window, manifest, index, store, analysis)
+
+    schedule(jobs, max_jobs, license_caps, orchestrator, tracer, dependencies=True)
+
+    for solver_type in ["steady", "transient"]:
+        compact_results(solver_type)
+
+    return spro_steady_files + spro_transient_files
+
+'''
+Creates the jobs that produce the solved .spro of one variation: CFturbo -> .spro modification -> SimericsMP
+(-> storing the artifacts in the cache), or a single restore job if the design is already in the cache
+(which solves the design itself if the entry is corrupt, see restore_or_solve).
+With a manifest, stages finished in an earlier run are left out and finished stages are recorded.
+
+Inputs:
+variation [string] = variation file name
+stage_components [list] = initial and final stage component numbers (see modify_spro)
+initial [Job] = job solving the .sres used as initial solution, named after its .spro (None = no initial solution)
+timeout, retries = scheduler settings (see make_batch)
+convergence_criteria, convergence_window = early stopping (see run_simerics_batch)
+cache [ResultCache] = result cache (None = no cache)
+key [string] = cache key of the design (see design_key)
+manifest [Manifest] = campaign manifest (None = no manifest)
+index [int] = design number
+warm_start [WarmStart] = a run without initial solution starts from the nearest solved design (None = cold start)
+
+Outputs:
+jobs [list] = jobs of the chain; the last job is the one that finishes once the design is solved
+'''
+def solver_chain(variation, stage_components, initial, timeout, retries, convergence_criteria, convergence_window, cache, key, manifest=None, index=None, warm_start=None):
+
+    spro = variation.replace(".cft-batch", ".spro")
+    prefix = os.path.basename(spro).split(".")[0]
+    solver_type = prefix.split("_")[-1]
+
+    def done(stage):
+        return manifest is not None and manifest.is_done(index, solver_type, stage)
+
+    def record(job, *stages):
+        def mark():
+            for stage in stages:
+                manifest.mark(index, solver_type, stage)
+        if manifest is not None:
+            job.on_done = mark
+        return job
+
+    if manifest is not None:
+        manifest.register(index, solver_type, key)
+        manifest.mark(index, solver_type, "rendered")
+
+    if done("solved"):
+        # Named like the solve job, so a transient chain can still depend on it:
+        return [Job(prefix, lambda: None, "skipped")]
+
+    jobs = []
+
+    if not done("geometry"):
+        jobs.append(record(cfturbo_job(variation, timeout, retries), "geometry"))
+
+    if not done("modified"):
+        jobs.append(record(Job(prefix + "_modify", partial(modify_spro, spro, stage_components), "python", depends_on=jobs[-1:]), "modified"))
+
+    if initial is None:
+        solve = simerics_job(spro, None, timeout, retries, convergence_criteria, convergence_window)
+        solve.depends_on = jobs[-1:]
+        if warm_start is not None:
+            solve.on_start = partial(warm_start.prepare, spro, solve)
+    else:
+        solve = simerics_job(spro, initial.name + ".sres", timeout, retries, convergence_criteria, convergence_window)
+        solve.depends_on = jobs[-1:] + [initial]
+
+    if cache is not None:
+        jobs.append(Job(prefix + "_cache", partial(cache.store, key, prefix), "python", depends_on=[solve]))
+
+    jobs.append(record(solve, "solved"))
+
+    if cache is not None and cache.contains(key):
+        # The chain only runs if the entry turns out to be corrupt when it is restored (cache job last):
+        fallback = jobs[:-2] + jobs[-1:] + jobs[-2:-1]
+        restore = Job(prefix, partial(restore_or_solve, cache, key, prefix, fallback), "python", depends_on=[initial] if initial is not None else [])
+        return [record(restore, "geometry", "modified", "solved")]
+
+    return jobs
+
+'''
+Restores a design from the cache, or runs the jobs of its solver chain one after the other if the cache entry
+is gone or corrupt by the time the restore job runs (solver_chain only checks that the entry exists). The
+fallback runs bypass the license caps and the work queue of the campaign, since it is rare.
+
+Inputs:
+cache [ResultCache] = result cache
+key [string] = cache key of the design (see design_key)
+prefix [string] = file name prefix of the design (e.g. Design3_steady)
+jobs [list] = jobs solving the design, in the order they have to run
+'''
+def restore_or_solve(cache, key, prefix, jobs):
+
+    try:
+        cache.restore(key, prefix)
+        return
+    except KeyError as error:
+        print(str(error) + ", solving " + prefix + " instead")
+
+    for job in jobs:
+        run_job(job)
+        if job.status != "done":
+            raise RuntimeError(job.name + " " + job.status + " after " + str(job.attempts) + " attempt(s)")
+
+'''
+Creates the post-processing job of one solved design (nothing if it was post-processed in an earlier run).
+
+Outputs:
+jobs [list] = post-processing job (empty or one job)
+'''
+def post_process_job(solve, spro, base_name, steady_avg_window, transient_avg_window, manifest=None, index=None, store=None, analysis=None):
+
+    solver_type = os.path.basename(spro).split(".")[0].split("_")[-1]
+
+    if manifest is not None and manifest.is_done(index, solver_type, "post_processed"):
+        return []
+
+    job = Job(os.path.basename(spro).split(".")[0] + "_post_process", partial(post_process, [spro], base_name, steady_avg_window, transient_avg_window, [index], store, analysis), "post_process", depends_on=[solve])
+    if manifest is not None:
+        job.on_done = partial(manifest.mark, index, solver_type, "post_processed")
+
+    return [job]
+
+'''
+Averages the integrals of each .spro file and places the values in .csv file (one results_<solver>.csv per solver type).
+The averaging windows of all designs are loaded into one column block per solver type, so the mean, standard
+deviation, min/max and drift (second half minus first half of the window, relative to the mean) of every
+user defined expression are computed for all designs at once. The statistics go to statistics_<solver>.csv.
 
 Inputs:
 spro_files [list] = .spro files
 output_folder [string] = name of output folder containing the resulting geometry variations
 base_name [string] = base name of folder containing .stp files
 avgWindow [int] = number of iterations to calculate average values
+indices [list] = design number of each .spro file; rows are then appended to the existing .csv files instead of
+                 rewriting them from design 0, later rows replace earlier rows of the same design (used by run_pipeline,
+                 see compact_results)
+store [ResultsStore] = results store the rows are appended to as well (None = .csv files only)
+analysis [RevolutionAnalysis] = transient runs are averaged over their last whole revolutions instead of transient_avg_window rows;
+                                pulsation and harmonic amplitudes go to statistics_transient.csv and the phase-averaged
+                                waveforms to <design>_transient_phase.csv (None = row window)
 '''
 
-def post_process(spro_files, base_name, steady_avg_window, transient_avg_window):
+def post_process(spro_files, base_name, steady_avg_window, transient_avg_window, indices=None, store=None, analysis=None):
+
+    solved = {}
     index = 0
-    for spro in spro_files:
+    for n, spro in enumerate(spro_files):
         if base_name + "0_transient" in spro:
             index = 0
+        if indices is not None:
+            index = indices[n]
 
-        with open (spro, 'r') as infile:
+        solver_type = spro.split(".")[0].split("_")[1]
 
-            solver_type = spro.split(".")[0].split("_")[1]
+        if solver_type == "steady":
+            avgWindow = steady_avg_window
+        if solver_type == "transient":
+            avgWindow = transient_avg_window
 
-            if solver_type == "steady":
-                avgWindow = steady_avg_window
-            if solver_type == "transient":
-                avgWindow = transient_avg_window
-
-            for line in infile.readlines():
-                if "vflow_out" in line:
-                    vflow_out = float(line.split("=")[1])
-                    continue
-                if "Omega" in line:
-                    impeller_Number = re.search("Omega(\d) = ", line).group(1)
-                    rpm = round(float(line.split("=")[1])*9.5493)
-                    break
+        model = load_spro_model(spro)
+        vflow_out = model["vflow_out"]
+        impeller_Number = model["omega_number"]
+        rpm = round(model["omega"]*9.5493)
 
         integral_file = spro.split(".")[0] + "_integrals.txt"
 
-        result_Dict = {}
-        formatted_result_Dict = {}
+        extra = None
+        if solver_type == "transient" and analysis is not None and model["omega"]:
+            try:
+                window, extra, phase = analysis.analyze(integral_file, model["omega"])
+            except ValueError as error:
+                print(str(error) + ", averaging the last " + str(avgWindow) + " rows instead")
+        if extra is None:
+            window = pd.DataFrame(read_integrals_tail(integral_file, avgWindow))
+
+        names = []
+        for key in window.columns:
+            if "DPtt" + impeller_Number in key:
+                names.append('DPtt_imp')
+            elif "Eff_tt_" + impeller_Number in key:
+                names.append('Eff_tt_imp')
+            else:
+                names.append(key[8:])
+        window.columns = names
+        window = window.loc[:, ~window.columns.duplicated(keep="last")]
+        if extra is not None:
+            extra.columns = names
+            extra = extra.loc[:, ~extra.columns.duplicated(keep="last")]
+            phase.columns = names
+            phase.loc[:, ~phase.columns.duplicated(keep="last")].to_csv(spro.split(".")[0] + "_phase.csv")
+
         units_Dict, desc_Dict = get_Dicts(spro)
-        with open (integral_file, 'r') as infile:                                   
-            result_List = list(infile)                                                                  
-            del result_List[1:-avgWindow]                                  
-            reader = csv.DictReader(result_List, delimiter="\t")
-            for row in reader:
-                for key, value in row.items():
-                    if 'userdef.' in key:                                                               
-                        if key in result_Dict:                                                           
-                            result_Dict[key] += float(value)                              
-                        else:
-                            result_Dict[key] = float(value)
-            formatted_result_Dict[base_name] = index
-            units_Dict[base_name] = '-'
-            desc_Dict[base_name] = '-'
-            formatted_result_Dict['vflow_out'] = vflow_out
-            units_Dict['vflow_out'] = '[m3/s]'
-            desc_Dict['vflow_out'] = 'Outlet volumetric flux'
-            formatted_result_Dict['Revolutions'] = rpm
-            units_Dict['Revolutions'] = '[rpm]'
-            desc_Dict['Revolutions'] = 'Outlet volumetric flux'
-            for key, value in result_Dict.items():
-                if 'userdef.' in key:
-                    if "DPtt" + impeller_Number in key:
-                        formatted_result_Dict['DPtt_imp'] = result_Dict[key]/avgWindow  
-                    elif "Eff_tt_" + impeller_Number in key:
-                        formatted_result_Dict['Eff_tt_imp'] = result_Dict[key]/(avgWindow)    
-                    else:
-                        formatted_result_Dict[key[8:]] = result_Dict[key]/(avgWindow)                              
+        solved.setdefault(solver_type, []).append((index, rpm, vflow_out, impeller_Number, units_Dict, desc_Dict, window, extra))
+        index = index + 1
+
+    for solver_type, designs in solved.items():
+        windows = pd.concat([design[6] for design in designs], keys=[design[0] for design in designs], names=[base_name, "row"])
+        grouped = windows.groupby(level=0, sort=False)
+        mean = grouped.mean()
+
+        row = grouped.cumcount().values
+        second_half = row >= (row + grouped.cumcount(ascending=False).values + 1) / 2
+        drift = (windows[second_half].groupby(level=0, sort=False).mean() - windows[~second_half].groupby(level=0, sort=False).mean())/mean.abs()
+
+        quantities = {'mean': mean, 'std': grouped.std(), 'min': grouped.min(), 'max': grouped.max(), 'drift': drift}
+        analysed = [(design[0], design[7]) for design in designs if design[7] is not None]
+        for quantity in dict.fromkeys(name for _, extra in analysed for name in extra.index):
+            rows = [(index, extra.loc[quantity]) for index, extra in analysed if quantity in extra.index]
+            quantities[quantity] = pd.DataFrame([row for _, row in rows], index=[index for index, _ in rows]).reindex(index=mean.index, columns=mean.columns)
+        statistics = pd.concat(quantities, axis=1)
+        statistics = statistics.stack(level=1)
+        statistics.index.names = [base_name, 'quantity']
+
+        results = mean.copy()
+        results.insert(0, 'vflow_out', [design[2] for design in designs])
+        results.insert(0, 'Revolutions', [design[1] for design in designs])
+        results = results.reset_index()
+
+        impeller_Number = designs[0][3]
         order = [base_name, 'Revolutions', 'vflow_out', 'DPtt', 'DPtt_stage', 'DPtt_imp', 'Eff_tt', 'Eff_tt_stage', 'Eff_tt_imp', 'PC' + impeller_Number, 'Torque' + impeller_Number, 'H', 'H' + impeller_Number,]
-        for var in formatted_result_Dict.keys():
+        order = [var for var in order if var in results.columns]
+        for var in results.columns:
             if var not in order:
                 order.append(var)
-        order_dict = {k: formatted_result_Dict[k] for k in order}
-        with open ('results_' + solver_type + '.csv', 'a+', newline='') as outfile:                             
-            writer = csv.DictWriter(outfile, fieldnames=order_dict.keys(), delimiter=",")             
-            if index == 0:                                                        
-                outfile.truncate(0)
-                writer.writeheader()
-                writer.writerow(units_Dict)
-                writer.writerow(desc_Dict)                                                                    
-            writer.writerow(formatted_result_Dict)
 
-        index = index + 1
+        units_Dict, desc_Dict = designs[0][4], designs[0][5]
+        units_Dict.update({base_name: '-', 'vflow_out': '[m3/s]', 'Revolutions': '[rpm]'})
+        desc_Dict.update({base_name: '-', 'vflow_out': 'Outlet volumetric flux', 'Revolutions': 'Outlet volumetric flux'})
+
+        if store is not None:
+            store.append(solver_type, results[order], units_Dict, desc_Dict)
+
+        results_file = 'results_' + solver_type + '.csv'
+        statistics_file = 'statistics_' + solver_type + '.csv'
+        upsert = indices is not None and os.path.exists(results_file) and os.path.getsize(results_file) > 0
+
+        if upsert:
+            # Only the header is read, the rows are appended (see compact_results):
+            with open(results_file, 'r', newline='') as infile:
+                order = next(csv.reader(infile))
+            with open(results_file, 'a', newline='') as outfile:
+                csv.writer(outfile, delimiter=",").writerows(results.reindex(columns=order).astype(object).values.tolist())
+        else:
+            rows = [order, [units_Dict.get(var, '') for var in order], [desc_Dict.get(var, '') for var in order]]
+            rows += results.reindex(columns=order).astype(object).values.tolist()
+            with open(results_file, 'w', newline='') as outfile:
+                csv.writer(outfile, delimiter=",").writerows(rows)
+
+        if upsert and os.path.exists(statistics_file) and os.path.getsize(statistics_file) > 0:
+            columns = pd.read_csv(statistics_file, index_col=[0, 1], nrows=0).columns
+            if set(statistics.columns) <= set(columns):
+                statistics.reindex(columns=columns).to_csv(statistics_file, mode='a', header=False)
+            else:
+                # New quantities (e.g. the first revolution analysis) need a new header:
+                existing = pd.read_csv(statistics_file, index_col=[0, 1])
+                pd.concat([existing, statistics]).to_csv(statistics_file)
+        else:
+            statistics.to_csv(statistics_file)
 
     return 0
 
-def combine_csv(base_file_name):
+'''
+Removes the rows of a results_<solver>.csv and statistics_<solver>.csv replaced by a later upsert of the same
+design (the last row of a design wins) and sorts both files by design.
+
+Inputs:
+solver_type [string] = steady or transient
+'''
+def compact_results(solver_type):
 
-    parent_path = os.getcwd()
-    csv_files = []
+    results_file = 'results_' + solver_type + '.csv'
+    statistics_file = 'statistics_' + solver_type + '.csv'
 
-    for file in os.listdir(parent_path):
-        if 'results' in file and '.csv' in file:
-            csv_files.append(file)
+    if os.path.exists(results_file) and os.path.getsize(results_file) > 0:
+        with open(results_file, 'r', newline='') as infile:
+            rows = list(csv.reader(infile))
+        design_rows = {}
+        for row in rows[3:]:
+            design_rows[int(row[0])] = row
+        with open(results_file, 'w', newline='') as outfile:
+            csv.writer(outfile, delimiter=",").writerows(rows[:3] + [design_rows[design] for design in sorted(design_rows)])
 
-    writer = pd.ExcelWriter(base_file_name + '_results.xlsx', engine='xlsxwriter', engine_kwargs={'options': {'strings_to_numbers': True}})
-    for csv in csv_files:
-        solver_type = csv.split(".")[0].split("_")[-1]
-        df = pd.read_csv(csv)
-        df.to_excel(writer, sheet_name=solver_type, index=False)
-    writer.save()
+    if os.path.exists(statistics_file) and os.path.getsize(statistics_file) > 0:
+        statistics = pd.read_csv(statistics_file, index_col=[0, 1])
+        statistics = statistics[~statistics.index.duplicated(keep="last")]
+        statistics.sort_index(level=0, sort_remaining=False, kind="stable").to_csv(statistics_file)
 
     return 0
 
 '''
-Organizes the files into folders based on design variations.
+Renders and solves the steady variations of a values array and returns the objective value of every design
+(used as the evaluate function of adaptive_sampling). Designs solved by an earlier call are skipped through
+the manifest (or restored from the cache).
+
+Inputs:
+values_array [np.array] = all designs so far (one row per variable, one column per design)
+template [CftTemplate] = steady template returned by make_template
+units [list] = variable units returned by make_template
+base_name [string] = base name of the variations
+objective [dict] = objective of the search (see objective_values)
+run [function] = runs a list of variations (run_pipeline with every other argument bound)
+
+Outputs:
+objective_values [np.array] = objective value of every design (NaN for failed designs)
+'''
+def evaluate_designs(values_array, template, units, base_name, objective, run):
+
+    variations = make_variations(template, units, values_array, base_name)
+    run(variations)
+
+    results = pd.read_csv("results_steady.csv", skiprows=[1, 2], index_col=0)
+    results = results[~results.index.duplicated(keep="last")]
+    results = results.reindex(range(1, values_array.shape[1] + 1))
+
+    return objective_values(results, objective)
+
+'''
+Indexes the files of the working directory by design and solver type in a single directory scan.
+
+Inputs:
+parent_path [string] = folder holding the design files
+base_name [string] = base name of the design files (e.g. Design)
+designs [set] = design numbers to index (None = every design)
+
+Outputs:
+index [dict] = design number -> solver type -> file names
+'''
+def index_design_files(parent_path, base_name, designs=None):
+
+    pattern = re.compile(re.escape(base_name) + "(\\d+)")
+    index = {}
+
+    with os.scandir(parent_path) as entries:
+        for entry in entries:
+            match = pattern.match(entry.name)
+            if match is None or entry.is_dir():
+                continue
+            design = int(match.group(1))
+            if designs is not None and design not in designs:
+                continue
+            for solver_type in ["steady", "transient"]:
+                if solver_type in entry.name:
+                    index.setdefault(design, {}).setdefault(solver_type, []).append(entry.name)
+                    break
+
+    return index
+
+'''
+Moves a file, falling back to copy and delete when source and destination are on different devices.
+'''
+def move_file(old_path, new_path):
+
+    try:
+        os.replace(old_path, new_path)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        shutil.copy2(old_path, new_path)
+        os.remove(old_path)
+
+'''
+Organizes the files into folders based on design variations (<base_name><n>/<solver_type>/). The working
+directory is scanned once and the moves are then performed as a batch.
 
 Inputs:
 variations [list] = variation file names
-output_folder [string] = name of output folder containing the resulting geometry variations
 base_name [string] = base name of folder containing .stp files
-'''
+manifest [Manifest] = campaign manifest the organized designs are recorded in (None = no manifest)
+max_workers [int] = number of moves performed in parallel (useful on network filesystems)
+dry_run [bool] = only print the planned moves
+artifacts [ArtifactStore] = moved meshes/geometry/results are replaced by links to their stored content (None = no deduplication)
 
-def organize_file_structure(variations, base_name):
+Outputs:
+moves [list] = (old path, new path) of every planned move
+'''
+def organize_file_structure(variations, base_name, manifest=None, max_workers=1, dry_run=False, artifacts=None):
 
     parent_path = os.getcwd()
 
-    for index in range(len(variations)):
-        for file in os.listdir(parent_path):
-            if base_name in file:
-                if re.match(base_name + "(\d+)", file).group(1) == str(index) and not os.path.isdir(file) and "steady" in file:
-                    old_path = os.path.join(parent_path, file)
-                    design_folder = os.path.join(parent_path, base_name + str(index))
-                    if not os.path.exists(design_folder):
-                        os.makedirs(design_folder)
-                    steady_folder = os.path.join(design_folder, "steady")
-                    if not os.path.exists(steady_folder):
-                        os.makedirs(steady_folder)
-                    new_path = os.path.join(steady_folder, file)        
-                    shutil.move(old_path, new_path)
-                
-                if re.match(base_name + "(\d+)", file).group(1) == str(index) and not os.path.isdir(file) and "transient" in file:
-                    old_path = os.path.join(parent_path, file)
-                    design_folder = os.path.join(parent_path, base_name + str(index))
-                    if not os.path.exists(design_folder):
-                        os.makedirs(design_folder)
-                    steady_folder = os.path.join(design_folder, "transient")
-                    if not os.path.exists(steady_folder):
-                        os.makedirs(steady_folder)
-                    new_path = os.path.join(steady_folder, file)        
-                    shutil.move(old_path, new_path)
-
-                   
-    return 0
+    designs = {}
+    for variation in variations:
+        design, solver_type = re.match(re.escape(base_name) + "(\\d+)_(\\w+)", os.path.basename(variation)).groups()
+        designs.setdefault(int(design), set()).add(solver_type)
+
+    index = index_design_files(parent_path, base_name, set(designs))
+
+    moves = []
+    for design, solver_files in index.items():
+        for solver_type, files in solver_files.items():
+            solver_folder = os.path.join(parent_path, base_name + str(design), solver_type)
+            if not dry_run:
+                os.makedirs(solver_folder, exist_ok=True)
+            moves += [(os.path.join(parent_path, file), os.path.join(solver_folder, file)) for file in files]
+
+    if dry_run:
+        for old_path, new_path in moves:
+            print(old_path + " -> " + new_path)
+        return moves
+
+    def organize(move):
+        move_file(*move)
+        if artifacts is None or not move[1].endswith(artifacts.suffixes):
+            return 0
+        try:
+            return artifacts.ingest(move[1])
+        except OSError as error:
+            print("Could not deduplicate " + move[1] + ": " + str(error))
+            return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        saved = sum(executor.map(organize, moves))
+
+    if artifacts is not None:
+        print("Deduplicated artifacts: " + str(round(saved/1024**2, 1)) + " MB linked instead of stored again")
+
+    if manifest is not None:
+        for design, solver_types in designs.items():
+            for solver_type in solver_types:
+                manifest.mark(design, solver_type, "organized")
+
+    return moves
 
 def main():
     '''
@@ -463,25 +732,136 @@ def main():
     base_file_name [string] = name of .txt file that holds the design parameter values
     delimiter [string] = delimiter used to partition the design parameter values within the .txt file
     steady_avg_window [int] = number of iterations used to average the user defined expressions within the intgrals files
+    doe_bounds [dict] = variable name -> (lower, upper); if given, the DOE is sampled (doe_method: sobol, latin_hypercube
+                        or full_factorial with doe_size designs/levels) instead of read from base_file_name + ".txt"
+    adaptive_objective [dict] = if given (with doe_bounds and pipeline), doe_size designs are sampled first and batches of
+                                adaptive_batch_size designs proposed by a surrogate model are added until adaptive_budget
+                                designs are solved or the objective stops improving (e.g. {"Eff_tt_stage": "max", "DPtt": 250.0})
+    transient_revolutions [int] = number of whole revolutions the transient results are averaged over (None = last transient_avg_window rows)
+    warm_start [bool] = whether steady runs start from the .sres of the nearest solved design with the same topology
+    blade_count [int] = number of impeller blades; the transient statistics then report blade passing harmonics instead of shaft orders
+    progress_timeout [float] = seconds without solver output or integrals growth before a run is stopped (None = no limit)
+    work_queue [bool] = whether the CFturbo/SimericsMP runs are distributed to workers on other nodes through base_file_name + "_queue"
+                        (start them with: python work_queue.py <campaign directory>/<base_file_name>_queue --jobs <n>)
+    export_excel [bool] = whether the results store is exported to base_file_name + "_results.xlsx" at the end
+    artifact_dir [string] = folder of the artifact store shared by the campaigns: the .stp, .sgrd and .sres files moved into
+                            the design folders are stored once per content there and linked from there (has to be on the
+                            filesystem of the campaigns, e.g. next to the campaign folder; None = no deduplication)
+    cache_dir [string] = folder of the result cache shared by the campaigns: designs solved before (in any campaign) are
+                         restored instead of built and solved again (at most 200 GB; files are linked through the
+                         artifact store if there is one, None = no cache)
+    The wall time of every stage and job and the CPU time and peak RSS of the solver processes are written to
+    base_file_name + "_trace.json" (Chrome trace) and summarized at the end.
     '''
     base_file_name = "AFnq109"
     delimiter = ","
     steady_avg_window = 5
     run_transient = False
     transient_avg_window = 120
+    transient_revolutions = 5
+    warm_start = False
+    blade_count = None
+    max_jobs = 8
+    license_caps = {"CFturbo": 8, "SimericsMP": 8}
+    job_timeout = None
+    job_retries = 1
+    pipeline = True
+    convergence_criteria = {"DPtt": 1e-3, "Eff_tt": 1e-3}
+    convergence_window = 50
+    doe_bounds = None
+    doe_method = "sobol"
+    doe_size = 64
+    doe_seed = 0
+    adaptive_objective = None
+    adaptive_batch_size = 8
+    adaptive_budget = 128
+    progress_timeout = 3600
+    work_queue = False
+    export_excel = False
+    artifact_dir = None
+    cache_dir = None
+    if adaptive_objective is not None and doe_bounds is None:
+        raise ValueError("adaptive_objective needs doe_bounds (the design space the surrogate model proposes designs in)")
+    manifest = Manifest(base_file_name + "_manifest.sqlite")
+    store = ResultsStore(base_file_name + "_results")
+    orchestrator = AsyncOrchestrator(base_file_name + "_logs", progress_timeout)
+    if work_queue == True:
+        orchestrator = WorkQueue(base_file_name + "_queue")
+    results_index = ResultsIndex(os.path.join(os.path.expanduser("~"), ".cft-batch_to_simerics_results.sqlite"))
+    artifacts = None
+    if artifact_dir is not None:
+        artifacts = ArtifactStore(artifact_dir)
+    cache = None
+    if cache_dir is not None:
+        cache = ResultCache(cache_dir, max_size=200*1024**3, artifacts=artifacts)
+    tracer = Tracer(base_file_name + "_trace.json")
+    analysis = None
+    if transient_revolutions is not None:
+        analysis = RevolutionAnalysis(transient_revolutions, blade_count=blade_count)
+    nearest_design = None
+    if warm_start == True:
+        nearest_design = WarmStart()
  
-    values_array = txt_to_np(base_file_name + ".txt", delimiter)
-    variables, units, components = make_template(base_file_name + "_steady.cft-batch", "template_steady.cft-batch")
-    variations = make_variations(base_file_name + "_steady.cft-batch", "template_steady.cft-batch", variables, units, components, values_array, "Design")
-
-    if run_transient == True:
-        variables, units, components = make_template(base_file_name + "_transient.cft-batch", "template_transient.cft-batch")
-        variations = variations + make_variations(base_file_name + "_transient.cft-batch", "template_transient.cft-batch", variables, units, components, values_array, "Design")
-
-    make_batch(base_file_name + ".bat", variations)
-    spro_files = run_simerics_batch(run_transient, base_file_name + "_simerics.bat", "Design")
-    post_process(spro_files, "Design", steady_avg_window, transient_avg_window)
-    combine_csv(base_file_name)
-    organize_file_structure(variations, "Design")
-
-main()
\ No newline at end of file
+    cft_batch = parse_cft_batch(base_file_name + "_steady.cft-batch")
+    with tracer.span("make_template"):
+        variables, units, components, template = make_template(cft_batch, "template_steady.cft-batch")
+
+    with tracer.span("design_of_experiments"):
+        if doe_bounds is None:
+            values_array = txt_to_np(base_file_name + ".txt", delimiter, variables)
+        else:
+            design_space = DesignSpace(variables, units, template.original_values, doe_bounds)
+            if doe_method == "sobol":
+                values_array = design_space.sobol(doe_size, doe_seed)
+            elif doe_method == "latin_hypercube":
+                values_array = design_space.latin_hypercube(doe_size, doe_seed)
+            else:
+                values_array = design_space.full_factorial(doe_size)
+
+    stage_components = None
+    if adaptive_objective is not None and pipeline == True:
+        stage_components = []
+        stage_components.append(int(input("Enter the number associated with the initial stage component: ")))
+        stage_components.append(int(input("Enter the number associated with the final stage component: ")))
+        run = partial(run_pipeline, False, base_name="Design", steady_avg_window=steady_avg_window, transient_avg_window=transient_avg_window, max_jobs=max_jobs, license_caps=license_caps,
+                      timeout=job_timeout, retries=job_retries, convergence_criteria=convergence_criteria, convergence_window=convergence_window, cache=cache, manifest=manifest, stage_components=stage_components, store=store, orchestrator=orchestrator, tracer=tracer, warm_start=nearest_design)
+        evaluate = partial(evaluate_designs, template=template, units=units, base_name="Design", objective=adaptive_objective, run=run)
+        with tracer.span("adaptive_sampling"):
+            values_array, objective = adaptive_sampling(design_space, evaluate, doe_size, adaptive_batch_size, adaptive_budget, seed=doe_seed)
+
+    with tracer.span("make_variations"):
+        variations = make_variations(template, units, values_array, "Design")
+
+        if run_transient == True:
+            cft_batch = parse_cft_batch(base_file_name + "_transient.cft-batch")
+            variables, units, components, template = make_template(cft_batch, "template_transient.cft-batch")
+            variations = variations + make_variations(template, units, values_array, "Design")
+
+    if pipeline == True:
+        with tracer.span("run_pipeline"):
+            spro_files = run_pipeline(run_transient, variations, "Design", steady_avg_window, transient_avg_window, max_jobs, license_caps, job_timeout, job_retries, convergence_criteria, convergence_window, cache, manifest, stage_components, store, orchestrator, tracer, analysis, nearest_design)
+    else:
+        with tracer.span("make_batch"):
+            make_batch(base_file_name + ".bat", variations, max_jobs, license_caps, job_timeout, job_retries, orchestrator, tracer)
+        with tracer.span("run_simerics_batch"):
+            spro_files = run_simerics_batch(run_transient, base_file_name + "_simerics.bat", "Design", max_jobs, license_caps, job_timeout, job_retries, convergence_criteria, convergence_window, max_jobs, orchestrator, tracer, nearest_design)
+        with tracer.span("post_process"):
+            post_process(spro_files, "Design", steady_avg_window, transient_avg_window, store=store, analysis=analysis)
+    with tracer.span("results"):
+        store.compact()
+        if export_excel == True:
+            store.export_excel(base_file_name + "_results.xlsx")
+    with tracer.span("organize_file_structure"):
+        organize_file_structure(variations, "Design", manifest, max_jobs, artifacts=artifacts)
+    with tracer.span("index_results"):
+        names, parameter_values = parameter_table(variables, units, template.original_values, values_array)
+        for solver_type in store.solver_types():
+            results_index.ingest(os.path.abspath(base_file_name), solver_type, store.read(solver_type), names, parameter_values)
+    manifest.summary()
+    if work_queue == True:
+        orchestrator.stop_workers()
+    tracer.save()
+    tracer.summary()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
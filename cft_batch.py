@@ -0,0 +1,235 @@
+import os
+import re
+
+BASE_NAME_SLOT = -1
+
+'''
+Compiled .cft-batch template. The template text is split once into literal segments around the
+value slots, so a variation is rendered by interleaving the segments with a column of values
+instead of searching every line for every "{variable}" key.
+
+Inputs:
+segments [list] = literal text between slots (always one more segment than slots)
+slots [list] = slot keys in file order (variable index [int] or BASE_NAME_SLOT for <BaseFileName>)
+variables [list] = variable names associated with the manipulated geometry parameters
+original_values [list] = values of the variables within the original .cft-batch file
+base_file_name [string] = original <BaseFileName> (e.g. AFnq109_steady)
+'''
+class CftTemplate:
+
+    def __init__(self, segments, slots, variables, original_values, base_file_name):
+        self.segments = segments
+        self.slots = slots
+        self.variables = variables
+        self.original_values = original_values
+        self.base_file_name = base_file_name
+        self.solver_type = base_file_name.split("_")[-1]
+
+    '''
+    Renders one variation as a string.
+
+    Inputs:
+    column [list] = formatted values (strings), one per variable
+    design_name [string] = new <BaseFileName> without the solver type suffix (e.g. Design3)
+    '''
+    def render(self, column, design_name):
+
+        base_file_name = design_name + "_" + self.solver_type
+        parts = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot == BASE_NAME_SLOT:
+                parts.append(base_file_name)
+            else:
+                parts.append(column[slot])
+            parts.append(segment)
+
+        return "".join(parts)
+
+    '''
+    Renders every column of values_array into its own .cft-batch file, writing each file as soon
+    as it is rendered so that only one variation is held in memory at a time.
+
+    Inputs:
+    values_array [np.array] = formatted values (strings), one column per geometry variation
+    base_name [string] = base name of folder containing .stp files
+    first_index [int] = design number of the first column
+    directory [string] = folder the variation files are written to
+
+    Outputs:
+    variations [list] = list of variation file names
+    '''
+    def render_all(self, values_array, base_name, first_index=0, directory=""):
+
+        variations = []
+
+        for i, column in enumerate(values_array.T, start=first_index):
+            design_name = base_name + str(i)
+            new_file = os.path.join(directory, design_name + "_" + self.solver_type + ".cft-batch")
+
+            with open(new_file, "w") as new:
+                new.write(self.render(column, design_name))
+
+            variations.append(new_file)
+
+        return variations
+
+    '''
+    Writes the template with "{variable}" placeholders (for inspection and manual editing).
+    '''
+    def write(self, template_file):
+
+        placeholders = ["{" + variable + "}" for variable in self.variables]
+        design_name = self.base_file_name[:-len("_" + self.solver_type)]
+
+        with open(template_file, "w") as template:
+            template.write(self.render(placeholders, design_name))
+
+'''
+In-memory model of a .cft-batch file exported from CFturbo software.
+
+Inputs:
+lines [list] = lines of the .cft-batch file
+components [list] = component names listed within the .cft-batch file
+variables [list] = variable names associated with the manipulated geometry parameters
+original_values [list] = values of the variables within the .cft-batch file
+units [list] = variable units (Array/Vector units are repeated once per element)
+value_spans [list] = (line number, start, end) of each variable value
+base_file_name [string] = original <BaseFileName> (e.g. AFnq109_steady)
+base_file_name_spans [list] = (line number, start, end) of each <BaseFileName> value
+component_lines [list] = line numbers of the component entries of ExportComponents
+'''
+class CftBatch:
+
+    def __init__(self, lines, components, variables, original_values, units, value_spans, base_file_name, base_file_name_spans, component_lines):
+        self.lines = lines
+        self.components = components
+        self.variables = variables
+        self.original_values = original_values
+        self.units = units
+        self.value_spans = value_spans
+        self.base_file_name = base_file_name
+        self.base_file_name_spans = base_file_name_spans
+        self.component_lines = component_lines
+
+    '''
+    Component names with the square brackets removed (as expected by the exported file names).
+    '''
+    def formatted_components(self):
+
+        return [component.replace("[", " ").replace("]", " ").strip() for component in self.components]
+
+    '''
+    Compiles the model into a CftTemplate with one slot per variable value and <BaseFileName>.
+
+    Outputs:
+    template [CftTemplate] = compiled template used to render the geometry variations
+    '''
+    def compile(self):
+
+        lines = list(self.lines)
+        for line_number, component, formatted_component in zip(self.component_lines, self.components, self.formatted_components()):
+            lines[line_number] = lines[line_number].replace(component, formatted_component)
+
+        spans = [(span, index) for index, span in enumerate(self.value_spans)]
+        spans += [(span, BASE_NAME_SLOT) for span in self.base_file_name_spans]
+        spans.sort()
+
+        segments = []
+        slots = []
+        segment = []
+        next_line = 0
+        for (line_number, start, end), slot in spans:
+            segment.extend(lines[next_line:line_number])
+            segment.append(lines[line_number][:start])
+            segments.append("".join(segment))
+            slots.append(slot)
+            segment = [lines[line_number][end:]]
+            next_line = line_number + 1
+
+        segment.extend(lines[next_line:])
+        segments.append("".join(segment))
+
+        return CftTemplate(segments, slots, self.variables, self.original_values, self.base_file_name)
+
+'''
+Parses a .cft-batch file in a single streaming pass.
+
+Inputs:
+cft_batch_file [string] = name of original .cft-batch file exported from CFturbo software
+
+Outputs:
+cft_batch [CftBatch] = parsed model of the .cft-batch file
+'''
+def parse_cft_batch(cft_batch_file):
+
+    lines = []
+    components = []
+    component_lines = []
+    candidates = []
+    units = []
+    base_file_name = ""
+    base_file_name_spans = []
+    remaining_components = 0
+    templated = True
+    array_key = None
+
+    with open(cft_batch_file, "r") as cft_batch:
+        for line_number, line in enumerate(cft_batch):
+            lines.append(line)
+
+            if array_key is not None:
+                if array_key in line:
+                    units += [array_unit] * array_count
+                    array_key = None
+                else:
+                    array_count += 1
+
+            if remaining_components > 0:
+                components.append(line.split("\"")[3])
+                component_lines.append(line_number)
+                remaining_components -= 1
+
+            if templated and "Type=" in line and "</" in line and "ExportInterface" not in line:
+                match = re.search(">(.*)</", line)
+                variable = re.search("</(.*)>", line).group(1)
+                candidates.append((line_number, variable, match))
+
+            if templated and "ExportComponents " in line:
+                remaining_components = int(line.split("\"")[1])
+                templated = False
+
+            if "<BaseFileName>" in line:
+                match = re.search("<BaseFileName>(.*)</BaseFileName>", line)
+                base_file_name = match.group(1)
+                base_file_name_spans.append((line_number, match.start(1), match.end(1)))
+
+            if "Caption=" in line and "Desc=" in line:
+                if "Array" in line:
+                    array_unit = re.search("Unit=\"(.*)\"", line).group(1)
+                    array_key = "</" + line.split(" ")[0].lstrip()[1:] + ">"
+                    array_count = 0
+
+                elif "Vector" in line:
+                    count = re.search("Count=\"(\\d+)\"", line) or re.search("([\\d])", line)
+                    unit = re.search("Unit=\"(.*)\"", line).group(1)
+                    units += [unit] * int(count.group(1))
+
+                elif "Unit" not in line:
+                    units.append("-")
+
+                else:
+                    units.append(re.search("Unit=\"(.*)\"", line).group(1))
+
+    component_set = set(components)
+    variables = []
+    original_values = []
+    value_spans = []
+
+    for line_number, variable, match in candidates:
+        if set(lines[line_number].split("\"")) & component_set:
+            continue
+        variables.append(variable)
+        original_values.append(match.group(1))
+        value_spans.append((line_number, match.start(1), match.end(1)))
+
+    return CftBatch(lines, components, variables, original_values, units, value_spans, base_file_name, base_file_name_spans, component_lines)
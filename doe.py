@@ -0,0 +1,151 @@
+import numpy as np
+from itertools import islice
+
+'''
+Checks whether a text field is a number.
+'''
+def is_number(field):
+
+    try:
+        float(field)
+    except ValueError:
+        return False
+
+    return True
+
+'''
+Converts the text values of a .cft-batch file to float64 (values that are no numbers, e.g. text options, become NaN).
+'''
+def numeric_values(values):
+
+    return np.array([float(value) if is_number(value) else np.nan for value in values], dtype=np.float64)
+
+'''
+Orders the rows of a parameter array like the template variables. Names may repeat (e.g. the Value
+elements of an Array variable); the n-th row with a name is matched with the n-th variable with that name.
+
+Inputs:
+names [list] = variable name of each row of values
+values [np.array] = parameter values (one row per variable)
+variables [list] = variable names returned by make_template
+
+Outputs:
+values [np.array] = rows reordered like variables
+'''
+def order_rows(names, values, variables):
+
+    rows = {}
+    for row, name in enumerate(names):
+        rows.setdefault(name, []).append(row)
+
+    order = []
+    for variable in variables:
+        if not rows.get(variable):
+            raise ValueError("No values for variable " + variable)
+        order.append(rows[variable].pop(0))
+
+    return values[order]
+
+'''
+Loads a DOE file into a float64 array (column vector is one geometry variation).
+Dimensions should be in [m] and angles should be in [deg].
+
+Two layouts are supported:
+- one line per variable and one column per design (the layout of txt_to_np); a line may start with the
+  variable name, in which case the rows are ordered like variables
+- designs_as_rows=True: a header line with the variable names followed by one line per design
+
+Inputs:
+txt_file [string] = name of .txt file containing geometry variation parameters
+delimiter [string] = delimiter used within .txt file
+variables [list] = variable names returned by make_template (only used with variable names in the file)
+designs_as_rows [bool] = file layout (see above)
+
+Outputs:
+values_array [np.array] = float64 array of geometry parameter values (one row per variable)
+'''
+def load_doe(txt_file, delimiter, variables=None, designs_as_rows=False):
+
+    if designs_as_rows:
+        return np.hstack(list(iter_doe(txt_file, delimiter, variables, chunk_size=None)))
+
+    names = []
+    rows = []
+
+    with open(txt_file, "r") as txt:
+        for line in txt:
+            if not line.strip():
+                continue
+            fields = [field.strip() for field in line.split(delimiter)]
+            if not is_number(fields[0]):
+                names.append(fields.pop(0))
+            rows.append(fields)
+
+    values_array = np.array(rows, dtype=np.float64)
+
+    if names and variables is not None:
+        values_array = order_rows(names, values_array, variables)
+
+    return values_array
+
+'''
+Streams a DOE file with one design per line (header line with the variable names first) in blocks of
+designs, so DOEs with 100k+ designs never have to be fully materialized.
+
+Inputs:
+txt_file [string] = name of .txt file containing geometry variation parameters
+delimiter [string] = delimiter used within .txt file
+variables [list] = variable names returned by make_template (None = keep the column order of the file)
+chunk_size [int] = number of designs per block (None = one block)
+
+Outputs:
+values_array [np.array] = float64 blocks of geometry parameter values (one row per variable, one column per design)
+'''
+def iter_doe(txt_file, delimiter, variables=None, chunk_size=10000):
+
+    with open(txt_file, "r") as txt:
+        names = [name.strip() for name in txt.readline().split(delimiter)]
+
+        while True:
+            lines = [line for line in islice(txt, chunk_size) if line.strip()]
+            if not lines:
+                break
+
+            block = np.loadtxt(lines, delimiter=delimiter, dtype=np.float64, ndmin=2).T
+            if variables is not None:
+                block = order_rows(names, block, variables)
+
+            yield block
+
+'''
+Converts the rows with unit rad from [deg] to [rad] in one vectorized step.
+
+Inputs:
+values_array [np.array] = float64 geometry parameter values (one row per variable)
+units [list] = variable units returned by make_template
+
+Outputs:
+values_array [np.array] = converted copy of values_array
+'''
+def to_radians(values_array, units):
+
+    values_array = np.array(values_array, dtype=np.float64)
+    mask = np.array(units) == "rad"
+    values_array[mask] = np.radians(values_array[mask])
+
+    return values_array
+
+'''
+Formats float64 parameter values for a .cft-batch file (integral values without a decimal point,
+e.g. for blade numbers, everything else with the shortest exact representation).
+
+Outputs:
+values_array [np.array] = object array of strings
+'''
+def format_values(values_array):
+
+    integral = np.isfinite(values_array) & (values_array == np.round(values_array)) & (np.abs(values_array) < 2**53)
+    formatted = values_array.astype(str).astype(object)
+    formatted[integral] = values_array[integral].astype(np.int64).astype(str)
+
+    return formatted
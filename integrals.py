@@ -0,0 +1,44 @@
+import os
+
+'''
+Reads the header and the last rows of a Simerics _integrals.txt file without loading the whole history.
+The file is read backwards from the end in blocks until enough rows are found, so the cost does not
+depend on the number of time steps/iterations stored in the file.
+
+Inputs:
+integral_file [string] = name of the _integrals.txt file
+num_rows [int] = number of rows to read from the end of the file
+prefix [string] = only columns starting with prefix are parsed (e.g. userdef.)
+delimiter [string] = delimiter used within the integrals file
+block_size [int] = number of bytes read per backward step
+
+Outputs:
+columns [dict] = column name -> list of float values (oldest row first)
+'''
+def read_integrals_tail(integral_file, num_rows, prefix="userdef.", delimiter="\t", block_size=65536):
+
+    with open(integral_file, "rb") as infile:
+        header = infile.readline()
+        header_end = infile.tell()
+
+        position = infile.seek(0, os.SEEK_END)
+        tail = b""
+        while position > header_end and tail.strip(b"\r\n").count(b"\n") < num_rows:
+            step = min(block_size, position - header_end)
+            position -= step
+            infile.seek(position)
+            tail = infile.read(step) + tail
+
+    names = header.decode().rstrip("\r\n").split(delimiter)
+    selected = [(index, name) for index, name in enumerate(names) if name.startswith(prefix)]
+
+    lines = [line for line in tail.decode().splitlines() if line.strip()]
+    lines = lines[-num_rows:] if num_rows > 0 else []
+
+    columns = {name: [] for index, name in selected}
+    for line in lines:
+        values = line.split(delimiter)
+        for index, name in selected:
+            columns[name].append(float(values[index]))
+
+    return columns
@@ -1,46 +1,38 @@
 from re import search
 from itertools import chain
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+SPRO_MODELS = {}
 
 def modify_spro(spro_file, stage_components):
 
+    data = read_spro(spro_file)
+
+    model = load_spro_model(spro_file, data)
+
     # Gets patch names for each componenet:
-    patches = []
-    with open(spro_file, 'r') as infile:
-        data = infile.readlines()
-        for line_number, line in enumerate(data):
-            if "<mgi name=" in line:
-                MGI_tuple = (data[line_number + 1].split("\"")[1],  data[line_number + 2].split("\"")[1])
-                patches.append(MGI_tuple)
-        
-        for line_number, line in enumerate(data):
-            if "plot.DPtt = " in line:
-                patches.insert(0, line.split("\"")[3])
-                patches.append(line.split("\"")[1])
+    patches = [tuple(MGI_tuple) for MGI_tuple in model["MGI_tuples"]]
+    for DPtt_patches in model["DPtt_patches"]:
+        patches.insert(0, DPtt_patches[1])
+        patches.append(DPtt_patches[0])
 
     # Gets the mismatched grid interface names:
-    MGIs = []
-    with open(spro_file, 'r') as infile:
-        for line in infile.readlines():
-            if "patch=\"MGI" in line:
-                MGIs.append(line.strip().split("\"")[1])
+    MGIs = list(model["MGIs"])
 
     # Gets the interface names for each control volume:
     CVIs = list(MGIs)
-    with open(spro_file, 'r') as infile:
-        for line in infile.readlines():
-            if "plot.DPtt = " in line:
-                CVIs.insert(0, line.split("\"")[3])
-                CVIs.append(line.split("\"")[1])
+    for DPtt_patches in model["DPtt_patches"]:
+        CVIs.insert(0, DPtt_patches[1])
+        CVIs.append(DPtt_patches[0])
 
     # Gets name/number associated with impellers:
-    impellers = []
-    with open(spro_file, 'r') as infile:
-        data = infile.readlines()
-        for line_number, line in enumerate(data):
-            if "#plot.PC" in line and "imp" in line:
-                impeller_number = search("#plot.PC(\d)", line).group(1)
-                impeller_name = data[line_number - 1].split("\"")[1].split("-")[0]
-                impellers.append((impeller_name, impeller_number))
+    impellers = [tuple(impeller) for impeller in model["impellers"]]
+    if impellers:
+        impeller_name, impeller_number = impellers[-1]
 
     stage_patches = list(chain(*patches[(stage_components[0] - 1):(stage_components[-1] + 1)]))
 
@@ -61,53 +53,27 @@ def modify_spro(spro_file, stage_components):
         stage_power = " + ".join(stage_power_components)
 
     # Gets the indentation of each expression:
-    with open(spro_file, 'r') as infile:
-        for line in infile.readlines():
-            if "#Outlet volumetric flux [m3/s]" in line or "#Mass flow [kg/s]" in line:
-                indent = line.split("#")[0]
-                break
+    indent = model["indent"]
 
     # Ensures consistent .sgrd file:
-    with open(spro_file, 'r') as infile:
-        data = infile.readlines()
-        for line_number, line in enumerate(data):
-            if ".sgrd" in line:
-                data[line_number] = line.replace("transient", "steady")
-                break
-    
+    if model["sgrd_line"] is not None:
+        data[model["sgrd_line"]] = data[model["sgrd_line"]].replace("transient", "steady")
+
     # Gets name of leakage interface:
-        with open(spro_file, 'r') as infile:
-            for line in infile.readlines():
-                if "OutletInterface" in line:
-                    leakage_interface = line.split("\"")[1].strip()
-                else:
-                    leakage_interface = 0
-
-    with open(spro_file, 'w') as outfile:
-        data = "".join(data)
-        outfile.write(data)
-    
+    leakage_interface = model["leakage_interface"]
+
+    # Expressions are checked against the existing plot.* keys and collected, then inserted
+    # before </expressions> in one go:
+    existing_keys = set(model["expression_keys"])
+    additions = []
+
     def insert_line(addition):
 
-        exists_already = False
-
-        with open(spro_file, 'r') as infile:
-            data = infile.readlines()
-            for line_number, line in enumerate(data):
-                if addition.split("\n")[0].strip() in line:
-                    exists_already = True
-                    
-        if exists_already == False:
-            with open(spro_file, 'r') as infile:
-                data = infile.readlines()
-                for line_number, line in enumerate(data):
-                    if "</expressions>" in line:
-                        data.insert(line_number, "\n" + addition + "\n")
-                        break
-
-            with open(spro_file, 'w') as outfile:
-                data = "".join(data)
-                outfile.write(data)
+        key = search(r"plot\.(\w+)\s*=", addition).group(1)
+
+        if key not in existing_keys:
+            existing_keys.add(key)
+            additions.append("\n" + addition + "\n")
 
     insert_line(indent + "#head [m]" + "\n" + indent + "plot.H = plot.DPtt/rho/9.81 \n" + indent + "#plot.H:head [m]")
 
@@ -157,20 +123,198 @@ def modify_spro(spro_file, stage_components):
         insert_line(indent + "#volumetric flow, OutletExtension, absolute [m3/s]" + "\n" + indent + "plot.vOutletExtension = flow.qv@\"" \
             + CVIs[-1] + "\"\n" + indent + "#plot.vOutletExtension:#volumetric flow, OutletExtension, absolute [m3/s]")
 
+    if model["expressions_end"] is not None:
+        data[model["expressions_end"]:model["expressions_end"]] = additions
+
+    write_spro(spro_file, data)
+    save_spro_model(spro_file, parse_spro("".join(data).splitlines(True)))
+
     return 0
 
-def get_Dicts(spro_file):
+'''
+Modifies .spro files in parallel across a process pool. A file that fails does not stop the others;
+the failures are reported once all files are done.
+
+Inputs:
+spro_files [list] = .spro files
+stage_components [list] = numbers of the initial and final stage component
+max_workers [int] = number of worker processes (1 = in this process, None = one per CPU)
+
+Outputs:
+failed [dict] = .spro file -> error of every file that could not be modified
+'''
+def modify_spro_files(spro_files, stage_components, max_workers=None):
+
+    failed = {}
 
-    with open(spro_file, "r") as infile:
-        units_Dict = {}
-        desc_Dict = {}
+    if max_workers == 1:
+        for spro in spro_files:
+            try:
+                modify_spro(spro, stage_components)
+            except Exception as error:
+                failed[spro] = repr(error)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(modify_spro, spro, stage_components): spro for spro in spro_files}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as error:
+                    failed[futures[future]] = repr(error)
+
+    print("Modified " + str(len(spro_files) - len(failed)) + " of " + str(len(spro_files)) + " .spro files")
+    for spro, error in failed.items():
+        print("Failed to modify " + spro + ": " + error)
+
+    return failed
+
+'''
+Reads a .spro file into a list of lines.
+'''
+def read_spro(spro_file):
+
+    with open(spro_file, 'r') as infile:
         data = infile.readlines()
-        for line in data:
-            if "#plot." in line:
-                key = line.split(":")[0].split(".")[1].strip()
-                units_Dict[key] = line.split(" ")[-1].strip() 
-                desc_Dict[key] = line.split("[")[0].split(":")[1].strip()
 
-    return units_Dict, desc_Dict
+    return data
+
+'''
+Writes the lines of a .spro file atomically (temporary file in the same folder, then replaced).
+'''
+def write_spro(spro_file, data):
+
+    folder = os.path.dirname(os.path.abspath(spro_file))
+    handle, temp_file = tempfile.mkstemp(prefix=".tmp_", suffix=".spro", dir=folder)
+
+    try:
+        with os.fdopen(handle, 'w') as outfile:
+            outfile.write("".join(data))
+        if os.path.exists(spro_file):
+            # mkstemp creates the file with mode 0600:
+            shutil.copymode(spro_file, temp_file)
+        os.replace(temp_file, spro_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+'''
+Gets the units and descriptions of the user expressions (#plot.<key>:<description> [<unit>] lines).
+'''
+def get_Dicts(spro_file):
 
-modify_spro("CRDF_v01_transient_8000rpm_1-25m3s.spro", [1, 2])
\ No newline at end of file
+    model = load_spro_model(spro_file)
+
+    return dict(model["units"]), dict(model["descriptions"])
+
+'''
+Parses everything the consumers of a .spro file need from it in a single pass over its lines: the interface
+and patch names used by modify_spro, the units/descriptions of get_Dicts and the operating point used by post_process.
+
+Inputs:
+data [list] = lines of the .spro file
+
+Outputs:
+model [dict] = parsed .spro metadata (JSON serializable)
+'''
+def parse_spro(data):
+
+    model = {"MGI_tuples": [], "DPtt_patches": [], "MGIs": [], "impellers": [], "indent": None, "sgrd_line": None, "leakage_interface": 0,
+             "expression_keys": [], "expressions_end": None, "units": {}, "descriptions": {}, "vflow_out": None, "omega": None, "omega_number": None}
+    omega_found = False
+
+    for line_number, line in enumerate(data):
+        if "<mgi name=" in line:
+            model["MGI_tuples"].append([data[line_number + 1].split("\"")[1], data[line_number + 2].split("\"")[1]])
+        if "plot.DPtt = " in line:
+            model["DPtt_patches"].append([line.split("\"")[1], line.split("\"")[3]])
+        if "patch=\"MGI" in line:
+            model["MGIs"].append(line.strip().split("\"")[1])
+        if "#plot.PC" in line and "imp" in line:
+            impeller_number = search(r"#plot\.PC(\d)", line).group(1)
+            model["impellers"].append([data[line_number - 1].split("\"")[1].split("-")[0], impeller_number])
+        if model["indent"] is None and ("#Outlet volumetric flux [m3/s]" in line or "#Mass flow [kg/s]" in line):
+            model["indent"] = line.split("#")[0]
+        if model["sgrd_line"] is None and ".sgrd" in line:
+            model["sgrd_line"] = line_number
+        # Only an OutletInterface on the last line counts (as in the original scan):
+        model["leakage_interface"] = line.split("\"")[1].strip() if "OutletInterface" in line else 0
+        match = search("^\\s*plot\\.(\\w+)\\s*=", line)
+        if match:
+            model["expression_keys"].append(match.group(1))
+        if model["expressions_end"] is None and "</expressions>" in line:
+            model["expressions_end"] = line_number
+        if "#plot." in line:
+            key = line.split(":")[0].split(".")[1].strip()
+            model["units"][key] = line.split(" ")[-1].strip()
+            model["descriptions"][key] = line.split("[")[0].split(":")[1].strip()
+        if not omega_found:
+            if "vflow_out" in line:
+                model["vflow_out"] = float(line.split("=")[1])
+            elif "Omega" in line:
+                omega_found = True
+                match = search("Omega(\\d) = ", line)
+                model["omega_number"] = match.group(1) if match else None
+                model["omega"] = float(line.split("=")[1])
+
+    return model
+
+'''
+Loads the parsed model of a .spro file. Models are cached in memory and in a sidecar file (<spro_file>.json)
+keyed on the path, modification time and size of the .spro file, so an unchanged file is parsed only once.
+
+Inputs:
+spro_file [string] = name of the .spro file
+data [list] = lines of the .spro file if already read (None = read when the cache is stale)
+
+Outputs:
+model [dict] = parsed .spro metadata (see parse_spro)
+'''
+def load_spro_model(spro_file, data=None):
+
+    key = spro_key(spro_file)
+    if key in SPRO_MODELS:
+        return SPRO_MODELS[key]
+
+    try:
+        with open(spro_file + ".json", "r") as infile:
+            sidecar = json.load(infile)
+        if sidecar["key"] == list(key):
+            SPRO_MODELS[key] = sidecar["model"]
+            return sidecar["model"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if data is None:
+        data = read_spro(spro_file)
+
+    return save_spro_model(spro_file, parse_spro("".join(data).splitlines(True)))
+
+'''
+Stores the model of the current version of a .spro file in memory and in its sidecar file.
+'''
+def save_spro_model(spro_file, model):
+
+    key = spro_key(spro_file)
+    SPRO_MODELS[key] = model
+
+    folder = os.path.dirname(os.path.abspath(spro_file))
+    handle, temp_file = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=folder)
+    try:
+        with os.fdopen(handle, 'w') as outfile:
+            json.dump({"key": list(key), "model": model}, outfile)
+        shutil.copymode(spro_file, temp_file)
+        os.replace(temp_file, spro_file + ".json")
+    except OSError:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+    return model
+
+def spro_key(spro_file):
+
+    stat = os.stat(spro_file)
+
+    return (os.path.abspath(spro_file), stat.st_mtime_ns, stat.st_size)
+
+if __name__ == "__main__":
+    modify_spro("CRDF_v01_transient_8000rpm_1-25m3s.spro", [1, 2])
\ No newline at end of file
@@ -0,0 +1,119 @@
+import math
+import os
+
+'''
+Parses a value of an integrals file (values the solver could not compute, e.g. -nan(ind) on Windows, become NaN).
+'''
+def parse_value(field):
+
+    try:
+        return float(field)
+    except ValueError:
+        return math.nan
+
+'''
+Follows a growing Simerics _integrals.txt file. Every call of read_rows only reads the bytes appended since
+the previous call; an incomplete last line is kept until the solver has finished writing it.
+
+Inputs:
+integral_file [string] = name of the _integrals.txt file
+delimiter [string] = delimiter used within the integrals file
+'''
+class IntegralsFollower:
+
+    def __init__(self, integral_file, delimiter="\t"):
+        self.integral_file = integral_file
+        self.delimiter = delimiter
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.buffer = ""
+        self.header = None
+        self.indices = None
+        self.restarted = False
+
+    '''
+    Reads the rows appended since the last call.
+
+    Inputs:
+    names [list] = column names to parse (e.g. userdef.DPtt)
+
+    Outputs:
+    rows [list] = one list of floats per new row (in the order of names)
+    '''
+    def read_rows(self, names):
+
+        if not os.path.exists(self.integral_file):
+            return []
+
+        # The solver restarted (e.g. a retry) and rewrote the file:
+        if os.path.getsize(self.integral_file) < self.offset:
+            self.reset()
+            self.restarted = True
+
+        with open(self.integral_file, "rb") as infile:
+            infile.seek(self.offset)
+            self.buffer += infile.read().decode()
+            self.offset = infile.tell()
+
+        lines = self.buffer.split("\n")
+        self.buffer = lines.pop()
+
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            if self.header is None:
+                self.header = line.rstrip("\r").split(self.delimiter)
+                missing = [name for name in names if name not in self.header]
+                if missing:
+                    raise ValueError(self.integral_file + " has no column(s) " + ", ".join(missing))
+                self.indices = [self.header.index(name) for name in names]
+                continue
+            values = line.rstrip("\r").split(self.delimiter)
+            rows.append([parse_value(values[index]) for index in self.indices])
+
+        return rows
+
+'''
+Convergence check on the user defined expressions of a running Simerics project. A quantity has converged
+when the relative change between the mean of the last window rows and the mean of the window before is
+below its tolerance; the run has converged when all quantities have.
+
+Inputs:
+integral_file [string] = name of the _integrals.txt file written by the solver
+criteria [dict] = expression name (without userdef.) -> relative tolerance (e.g. {"DPtt": 1e-3, "Eff_tt": 1e-3})
+window [int] = number of rows of each of the two compared windows
+'''
+class ConvergenceMonitor:
+
+    def __init__(self, integral_file, criteria, window):
+        self.follower = IntegralsFollower(integral_file)
+        self.names = ["userdef." + name for name in criteria]
+        self.tolerances = list(criteria.values())
+        self.window = window
+        self.rows = []
+
+    '''
+    Reads the new rows and returns True once every criterion is met.
+    '''
+    def __call__(self):
+
+        rows = self.follower.read_rows(self.names)
+        if self.follower.restarted:
+            self.follower.restarted = False
+            self.rows = []
+        self.rows = (self.rows + rows)[-2 * self.window:]
+
+        if len(self.rows) < 2 * self.window:
+            return False
+
+        for column, tolerance in enumerate(self.tolerances):
+            previous = sum(row[column] for row in self.rows[:self.window])/self.window
+            last = sum(row[column] for row in self.rows[self.window:])/self.window
+            # A diverged run (NaN or infinite values) never counts as converged:
+            if not math.isfinite(previous) or not math.isfinite(last) or last == 0 or abs(last - previous)/abs(last) > tolerance:
+                return False
+
+        return True
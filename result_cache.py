@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+MANIFEST = "manifest.json"
+
+'''
+Hashes a file in blocks (so large .sres/.sgrd files are never loaded at once).
+'''
+def file_hash(path, block_size=1048576):
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as infile:
+        for block in iter(lambda: infile.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+'''
+Creates the cache key of one design: a hash of the rendered .cft-batch parameters (the <BaseFileName>
+value is left out, so the same geometry gets the same key under any design number) and the solver settings.
+
+Inputs:
+variation [string] = rendered .cft-batch file of the design
+settings [dict] = solver settings that change the results (stage components, executables, initial solution key, ...)
+
+Outputs:
+key [string] = hex digest identifying the design's artifacts
+'''
+def design_key(variation, settings):
+
+    with open(variation, "r") as infile:
+        text = re.sub("<BaseFileName>.*</BaseFileName>", "<BaseFileName></BaseFileName>", infile.read())
+
+    digest = hashlib.sha256(text.encode())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+'''
+Content-addressed store of CFturbo/Simerics artifacts (.stp, .spro, .sgrd, .sres, _integrals.txt, ...)
+shared between campaigns. Every entry is a folder named after the design key holding the artifacts and a
+manifest with their sizes and hashes, which is checked before an entry is reused.
+
+Inputs:
+cache_dir [string] = folder of the cache (created if missing)
+max_size [int] = maximum total size in bytes; the least recently used entries are evicted above it (None = no limit)
+artifacts [ArtifactStore] = artifacts are linked (reflink, else hardlink) into and out of the cache through the
+                            artifact store instead of copied (None = copies)
+'''
+class ResultCache:
+
+    def __init__(self, cache_dir, max_size=None, artifacts=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.artifacts = artifacts
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    '''
+    Copies an artifact, or links it through the artifact store.
+    '''
+    def copy(self, source, destination):
+
+        if self.artifacts is None:
+            shutil.copy2(source, destination)
+            return
+
+        if os.path.exists(destination):
+            os.remove(destination)
+        self.artifacts.link(source, destination)
+
+    '''
+    Quick check (without the integrity check of lookup) whether a key has an entry.
+    '''
+    def contains(self, key):
+        return os.path.exists(os.path.join(self.entry_dir(key), MANIFEST))
+
+    '''
+    Reads the manifest of an entry and checks that every artifact is still intact.
+
+    Outputs:
+    manifest [dict] = manifest of the entry (None if missing or corrupt; corrupt entries are removed)
+    '''
+    def lookup(self, key):
+
+        entry = self.entry_dir(key)
+        try:
+            with open(os.path.join(entry, MANIFEST), "r") as infile:
+                manifest = json.load(infile)
+
+            for suffix, (size, digest) in manifest["files"].items():
+                path = os.path.join(entry, suffix)
+                if os.path.getsize(path) != size or file_hash(path) != digest:
+                    raise ValueError("corrupt artifact " + path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as error:
+            print("Removing cache entry " + key + ": " + str(error))
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        return manifest
+
+    '''
+    Stores the artifacts of one design.
+
+    Inputs:
+    key [string] = design key (see design_key)
+    prefix [string] = common file name prefix of the artifacts (e.g. Design3_steady)
+    files [list] = artifact file names starting with prefix (None = every file of the working directory
+                   starting with prefix, except the .cft-batch input and the .spro model sidecar)
+    '''
+    def store(self, key, prefix, files=None):
+
+        if files is None:
+            files = [file for file in os.listdir() if file.startswith(prefix) and not file.endswith((".cft-batch", ".spro.json"))]
+
+        temp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=self.cache_dir)
+        manifest = {"prefix": prefix, "files": {}, "last_used": time.time()}
+
+        try:
+            for file in files:
+                suffix = os.path.basename(file)[len(prefix):]
+                self.copy(file, os.path.join(temp_dir, suffix))
+                manifest["files"][suffix] = [os.path.getsize(file), file_hash(file)]
+
+            with open(os.path.join(temp_dir, MANIFEST), "w") as outfile:
+                json.dump(manifest, outfile)
+
+            os.rename(temp_dir, self.entry_dir(key))
+        except OSError:
+            # Another job stored the same design first:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.evict()
+
+    '''
+    Copies the artifacts of an entry into a folder under a new prefix. Design names inside the text
+    artifacts (.spro) are renamed as well, so grid and result references point at the restored files.
+
+    Outputs:
+    files [list] = restored file names
+    '''
+    def restore(self, key, prefix, directory=""):
+
+        manifest = self.lookup(key)
+        if manifest is None:
+            raise KeyError("No intact cache entry for " + prefix + " (" + key + ")")
+
+        entry = self.entry_dir(key)
+        old_design = manifest["prefix"].split("_")[0] + "_"
+        new_design = prefix.split("_")[0] + "_"
+        files = []
+
+        for suffix in manifest["files"]:
+            new_file = os.path.join(directory, prefix + suffix)
+            if suffix.endswith(".spro"):
+                with open(os.path.join(entry, suffix), "r") as infile:
+                    text = infile.read()
+                with open(new_file, "w") as outfile:
+                    outfile.write(text.replace(old_design, new_design))
+            else:
+                self.copy(os.path.join(entry, suffix), new_file)
+            files.append(new_file)
+
+        manifest["last_used"] = time.time()
+        with open(os.path.join(entry, MANIFEST), "w") as outfile:
+            json.dump(manifest, outfile)
+
+        return files
+
+    '''
+    Removes the least recently used entries until the cache is below max_size.
+    '''
+    def evict(self):
+
+        if self.max_size is None:
+            return
+
+        entries = []
+        total_size = 0
+        for key in os.listdir(self.cache_dir):
+            entry = self.entry_dir(key)
+            if key.startswith(".tmp_") or not os.path.isdir(entry):
+                continue
+            try:
+                with open(os.path.join(entry, MANIFEST), "r") as infile:
+                    manifest = json.load(infile)
+                size = sum(size for size, digest in manifest["files"].values())
+                last_used = manifest["last_used"]
+            except (OSError, ValueError, KeyError):
+                size, last_used = 0, 0
+            entries.append((last_used, size, entry))
+            total_size += size
+
+        for last_used, size, entry in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
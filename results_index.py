@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from doe import numeric_values
+
+'''
+Names the parameter rows of a values array (repeated names, e.g. the Value elements of an Array variable,
+get their occurrence appended: Value[0], Value[1], ...) and adds design 0 (the original .cft-batch values).
+
+Inputs:
+variables [list] = variable names returned by make_template
+units [list] = variable units returned by make_template
+original_values [list] = values within the original .cft-batch file (template.original_values)
+values_array [np.array] = geometry parameter values of designs 1, 2, ... (angles in [deg])
+
+Outputs:
+names [list] = unique parameter names
+parameter_values [np.array] = parameter values of designs 0, 1, 2, ... (angles in [deg]; NaN for text values)
+'''
+def parameter_table(variables, units, original_values, values_array):
+
+    names = []
+    for row, variable in enumerate(variables):
+        if variables.count(variable) > 1:
+            names.append(variable + "[" + str(variables[:row].count(variable)) + "]")
+        else:
+            names.append(variable)
+
+    original = numeric_values(original_values)
+    rad = np.array(units) == "rad"
+    original[rad] = np.degrees(original[rad])
+
+    return names, np.hstack((original[:, np.newaxis], values_array))
+
+'''
+Cross-campaign index of solved designs (SQLite). Every design is stored with its geometry parameters, its
+operating point (rpm, vflow_out from the .spro) and the post-processed metrics, all indexed by name and value
+so queries over hundreds of campaigns do not have to open their result files.
+
+Inputs:
+db_file [string] = name of the SQLite index file (created if missing)
+'''
+class ResultsIndex:
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS designs (id INTEGER PRIMARY KEY, campaign TEXT, design INTEGER, solver_type TEXT, rpm REAL, vflow_out REAL, ingested REAL, UNIQUE (campaign, design, solver_type))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS parameters (design_id INTEGER, name TEXT, value REAL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS metrics (design_id INTEGER, name TEXT, value REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS designs_operating_point ON designs (solver_type, rpm, vflow_out)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS parameters_value ON parameters (name, value, design_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS parameters_design ON parameters (design_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS metrics_value ON metrics (name, value, design_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS metrics_design ON metrics (design_id)")
+
+    '''
+    Adds (or replaces) the designs of one campaign.
+
+    Inputs:
+    campaign [string] = campaign identifier (e.g. the absolute path of its base file name)
+    solver_type [string] = steady or transient
+    results [pd.DataFrame] = post_process output with Design, Revolutions and vflow_out columns (ResultsStore.read,
+                             or pd.read_csv(results_csv, skiprows=[1, 2]) for older campaigns)
+    names [list] = parameter names (see parameter_table)
+    parameter_values [np.array] = parameter values, column n is design n (see parameter_table)
+    '''
+    def ingest(self, campaign, solver_type, results, names, parameter_values):
+
+        metric_names = [column for column in results.columns if column not in ["Design", "Revolutions", "vflow_out"]]
+
+        with self.lock, self.connection:
+            for row in results.to_dict("records"):
+                design = int(row["Design"])
+                design_id = self.connection.execute("SELECT id FROM designs WHERE campaign = ? AND design = ? AND solver_type = ?", (campaign, design, solver_type)).fetchone()
+                if design_id is not None:
+                    self.connection.execute("DELETE FROM parameters WHERE design_id = ?", design_id)
+                    self.connection.execute("DELETE FROM metrics WHERE design_id = ?", design_id)
+                    self.connection.execute("DELETE FROM designs WHERE id = ?", design_id)
+
+                cursor = self.connection.execute("INSERT INTO designs (campaign, design, solver_type, rpm, vflow_out, ingested) VALUES (?, ?, ?, ?, ?, ?)",
+                                                 (campaign, design, solver_type, float(row["Revolutions"]), float(row["vflow_out"]), time.time()))
+                design_id = cursor.lastrowid
+
+                if design < parameter_values.shape[1]:
+                    self.connection.executemany("INSERT INTO parameters VALUES (?, ?, ?)", [(design_id, name, float(value)) for name, value in zip(names, parameter_values[:, design]) if pd.notna(value)])
+                self.connection.executemany("INSERT INTO metrics VALUES (?, ?, ?)", [(design_id, name, float(row[name])) for name in metric_names if pd.notna(row[name])])
+
+    '''
+    Finds the best designs of all campaigns.
+
+    Inputs:
+    metric [string] = metric to rank by (e.g. Eff_tt_stage)
+    solver_type [string] = steady or transient
+    rpm, vflow_out [float or tuple] = exact value or (lower, upper) range of the operating point (None = any)
+    parameters [dict] = parameter name -> (lower, upper) range (e.g. {"beta2": (20, 25)})
+    maximize [bool] = rank by highest (True) or lowest (False) value
+    limit [int] = number of designs returned
+
+    Outputs:
+    designs [pd.DataFrame] = campaign, design, rpm, vflow_out and metric value of the best designs
+    '''
+    def query(self, metric, solver_type="steady", rpm=None, vflow_out=None, parameters=None, maximize=True, limit=10):
+
+        sql = "SELECT d.campaign, d.design, d.rpm, d.vflow_out, m.value AS \"" + metric + "\" FROM designs d JOIN metrics m ON m.design_id = d.id AND m.name = ?"
+        arguments = [metric]
+
+        for n, (name, (lower, upper)) in enumerate((parameters or {}).items()):
+            sql += " JOIN parameters p" + str(n) + " ON p" + str(n) + ".design_id = d.id AND p" + str(n) + ".name = ? AND p" + str(n) + ".value BETWEEN ? AND ?"
+            arguments += [name, lower, upper]
+
+        sql += " WHERE d.solver_type = ?"
+        arguments.append(solver_type)
+        for column, value in [("rpm", rpm), ("vflow_out", vflow_out)]:
+            if isinstance(value, tuple):
+                sql += " AND d." + column + " BETWEEN ? AND ?"
+                arguments += list(value)
+            elif value is not None:
+                sql += " AND d." + column + " = ?"
+                arguments.append(value)
+
+        sql += " ORDER BY m.value " + ("DESC" if maximize else "ASC") + " LIMIT ?"
+        arguments.append(limit)
+
+        with self.lock:
+            return pd.read_sql_query(sql, self.connection, params=arguments)
+
+    def close(self):
+        self.connection.close()
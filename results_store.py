@@ -0,0 +1,112 @@
+import glob
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+'''
+Typed columnar store of the post-processed results (Parquet). Every solver type has its own folder of part
+files; post_process appends the rows of the designs it just processed as a new part, so nothing is rewritten
+while a campaign runs. Units and descriptions live in the field metadata of the schema instead of extra rows.
+
+Inputs:
+store_dir [string] = folder of the store (created if missing)
+key [string] = design number column (rows of a design appended later replace earlier ones)
+'''
+class ResultsStore:
+
+    def __init__(self, store_dir, key="Design"):
+        self.store_dir = store_dir
+        self.key = key
+        os.makedirs(store_dir, exist_ok=True)
+
+    def parts(self, solver_type):
+        return sorted(glob.glob(os.path.join(self.store_dir, solver_type, "part-*.parquet")))
+
+    def solver_types(self):
+        return sorted(entry.name for entry in os.scandir(self.store_dir) if entry.is_dir() and self.parts(entry.name))
+
+    '''
+    Appends result rows as a new part file.
+
+    Inputs:
+    solver_type [string] = steady or transient
+    results [pd.DataFrame] = one row per design (numeric columns keep their dtype)
+    units [dict] = column name -> unit
+    descriptions [dict] = column name -> description
+    '''
+    def append(self, solver_type, results, units, descriptions):
+
+        table = pa.Table.from_pandas(results, preserve_index=False)
+        fields = [field.with_metadata({"unit": units.get(field.name, ""), "description": descriptions.get(field.name, "")}) for field in table.schema]
+        table = pa.Table.from_arrays(table.columns, schema=pa.schema(fields))
+
+        solver_dir = os.path.join(self.store_dir, solver_type)
+        os.makedirs(solver_dir, exist_ok=True)
+        part = os.path.join(solver_dir, "part-" + str(time.time_ns()) + "-" + str(os.getpid()) + ".parquet")
+        pq.write_table(table, part + ".tmp")
+        os.replace(part + ".tmp", part)
+
+    '''
+    Reads all parts of a solver type (the last row of every design wins).
+
+    Outputs:
+    results [pd.DataFrame] = one row per design, sorted by design
+    '''
+    def read(self, solver_type):
+
+        parts = self.parts(solver_type)
+        if not parts:
+            return pd.DataFrame()
+
+        table = pa.concat_tables([pq.read_table(part) for part in parts], promote_options="default")
+        results = table.to_pandas()
+
+        return results.drop_duplicates(self.key, keep="last").sort_values(self.key).reset_index(drop=True)
+
+    '''
+    Collects the units and descriptions of every column of a solver type.
+
+    Outputs:
+    units, descriptions [dict] = column name -> unit / description
+    '''
+    def metadata(self, solver_type):
+
+        units = {}
+        descriptions = {}
+        for part in self.parts(solver_type):
+            for field in pq.read_schema(part):
+                metadata = field.metadata or {}
+                units[field.name] = metadata.get(b"unit", b"").decode()
+                descriptions[field.name] = metadata.get(b"description", b"").decode()
+
+        return units, descriptions
+
+    '''
+    Merges the parts of every solver type into one part file (e.g. at the end of a campaign).
+    '''
+    def compact(self):
+
+        for solver_type in self.solver_types():
+            parts = self.parts(solver_type)
+            if len(parts) < 2:
+                continue
+            units, descriptions = self.metadata(solver_type)
+            self.append(solver_type, self.read(solver_type), units, descriptions)
+            for part in parts:
+                os.remove(part)
+
+    '''
+    Exports the store to an Excel workbook on demand (one sheet per solver type; the units and
+    descriptions are written below the header, the values stay numeric).
+    '''
+    def export_excel(self, xlsx_file):
+
+        with pd.ExcelWriter(xlsx_file, engine="xlsxwriter") as writer:
+            for solver_type in self.solver_types():
+                results = self.read(solver_type)
+                units, descriptions = self.metadata(solver_type)
+                header = pd.DataFrame([[units.get(column, "") for column in results.columns], [descriptions.get(column, "") for column in results.columns]], columns=results.columns)
+                header.to_excel(writer, sheet_name=solver_type, index=False)
+                results.to_excel(writer, sheet_name=solver_type, index=False, header=False, startrow=3)
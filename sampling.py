@@ -0,0 +1,123 @@
+import numpy as np
+from scipy.stats import qmc
+from doe import numeric_values
+
+'''
+Design space of a DOE built from the variables extracted by make_template. Variables with bounds are
+sampled, all others keep their value from the original .cft-batch file. Samples are returned in the
+units expected by make_variations (one row per variable, one column per design, angles in [deg]). Variables
+without a numeric value (e.g. text options) are NaN and keep their original text in the variations.
+
+Inputs:
+variables [list] = variable names returned by make_template
+units [list] = variable units returned by make_template
+original_values [list] = values within the original .cft-batch file (template.original_values)
+bounds [dict] = variable name -> (lower, upper), or a list of (lower, upper) with one entry per
+                occurrence of a repeated name (e.g. the Value elements of an Array variable)
+'''
+class DesignSpace:
+
+    def __init__(self, variables, units, original_values, bounds):
+        self.variables = variables
+
+        fixed_values = numeric_values(original_values)
+        rad = np.array(units) == "rad"
+        fixed_values[rad] = np.degrees(fixed_values[rad])
+        self.fixed_values = fixed_values
+
+        occurrences = {}
+        free = []
+        lower = []
+        upper = []
+        for row, variable in enumerate(variables):
+            occurrence = occurrences.get(variable, 0)
+            occurrences[variable] = occurrence + 1
+            if variable not in bounds:
+                continue
+            bound = bounds[variable]
+            if isinstance(bound, list):
+                if occurrence >= len(bound):
+                    continue
+                bound = bound[occurrence]
+            free.append(row)
+            lower.append(bound[0])
+            upper.append(bound[1])
+
+        unknown = set(bounds) - set(variables)
+        if unknown:
+            raise ValueError("Bounds given for unknown variables: " + ", ".join(sorted(unknown)))
+
+        self.free = np.array(free, dtype=int)
+        self.lower = np.array(lower, dtype=np.float64)
+        self.upper = np.array(upper, dtype=np.float64)
+
+    @property
+    def dimension(self):
+        return len(self.free)
+
+    '''
+    Maps samples of the unit hypercube (one row per design) to a values array for make_variations.
+    '''
+    def scale(self, unit_samples):
+
+        values_array = np.repeat(self.fixed_values[:, np.newaxis], len(unit_samples), axis=1)
+        values_array[self.free] = (self.lower + unit_samples*(self.upper - self.lower)).T
+
+        return values_array
+
+    '''
+    Maps a values array back to the unit hypercube (one row per design).
+    '''
+    def normalize(self, values_array):
+
+        return ((values_array[self.free].T - self.lower)/(self.upper - self.lower))
+
+    '''
+    Latin hypercube sample. skip > 0 continues an existing set of skip designs with an independent
+    sample derived from the same seed (so extending a set never recomputes or changes it).
+    '''
+    def latin_hypercube(self, num_designs, seed=None, skip=0):
+
+        if skip:
+            seed = np.random.default_rng([seed or 0, skip])
+        sampler = qmc.LatinHypercube(d=self.dimension, seed=seed)
+
+        return self.scale(sampler.random(num_designs))
+
+    '''
+    Scrambled Sobol sample (num_designs should be a power of 2 for balance). skip > 0 continues the
+    Sobol sequence of an existing set of skip designs generated with the same seed.
+    '''
+    def sobol(self, num_designs, seed=None, skip=0):
+
+        sampler = qmc.Sobol(d=self.dimension, scramble=True, seed=seed)
+        if skip:
+            sampler.fast_forward(skip)
+
+        return self.scale(sampler.random(num_designs))
+
+    '''
+    Full-factorial sample with levels values per variable (an int for all variables or one int per variable).
+    '''
+    def full_factorial(self, levels):
+
+        levels = np.broadcast_to(levels, (self.dimension,))
+        axes = [np.linspace(0, 1, level) if level > 1 else np.array([0.5]) for level in levels]
+        grid = np.meshgrid(*axes, indexing="ij")
+        unit_samples = np.stack([axis.ravel() for axis in grid], axis=1)
+
+        return self.scale(unit_samples)
+
+    '''
+    Appends num_designs new designs to an existing values array generated with the same method and seed.
+    '''
+    def extend(self, values_array, num_designs, method="sobol", seed=None):
+
+        if method == "sobol":
+            new_values = self.sobol(num_designs, seed, skip=values_array.shape[1])
+        elif method == "latin_hypercube":
+            new_values = self.latin_hypercube(num_designs, seed, skip=values_array.shape[1])
+        else:
+            raise ValueError("Only sobol and latin_hypercube samples can be extended")
+
+        return np.hstack((values_array, new_values))
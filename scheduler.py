@@ -0,0 +1,331 @@
+import os
+import subprocess
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from monitor import ConvergenceMonitor
+
+'''
+Solver executables. Both can be overridden through environment variables (e.g. to point the
+scheduler at a stub executable when testing on Linux).
+'''
+CFTURBO_EXE = os.environ.get("CFTURBO_EXE", "C:\\Program Files\\CFturbo 2021.2.0\\CFturbo.exe")
+SIMERICS_EXE = os.environ.get("SIMERICS_EXE", "C:\\Program Files\\Simerics\\SimericsMP.exe")
+
+# Seconds between two monitor checks of a running job:
+POLL_INTERVAL = 5.0
+
+'''
+One external solver invocation (or one Python step of the pipeline).
+
+Inputs:
+name [string] = job name used in reports (e.g. Design3_steady)
+command [list/function] = executable followed by its arguments, or a function called without arguments
+tool [string] = tool name used for the license cap (e.g. CFturbo, SimericsMP)
+timeout [float] = seconds before the run is killed (None = no limit)
+retries [int] = number of reruns after a failed or timed out attempt
+depends_on [list] = jobs that have to finish successfully before this job starts (see run_dag)
+monitor [function] = called every POLL_INTERVAL seconds while the process runs; the process is stopped
+                     and the job counts as done once it returns True (see monitor.ConvergenceMonitor)
+on_done [function] = called without arguments after the job finished successfully (e.g. to record progress)
+on_start [function] = called without arguments right before every attempt starts (e.g. to choose the initial solution)
+progress_file [string] = file whose growth counts as progress of the run (see async_scheduler.AsyncOrchestrator)
+result_file [string] = file the run has to have written when it is stopped early by its monitor (e.g. the .sres)
+arguments [list] = executable and arguments of a job whose command was replaced by a function running them elsewhere
+                   (see work_queue.WorkQueue.distribute; None = command holds them)
+pid [int] = process id of the running attempt (None for functions; used by tracing.Tracer)
+started [float] = time the first attempt started (None = not started yet)
+'''
+class Job:
+
+    def __init__(self, name, command, tool, timeout=None, retries=0, depends_on=None, monitor=None):
+        self.name = name
+        self.command = command
+        self.tool = tool
+        self.timeout = timeout
+        self.retries = retries
+        self.depends_on = depends_on or []
+        self.monitor = monitor
+        self.on_done = None
+        self.on_start = None
+        self.progress_file = None
+        self.result_file = None
+        self.arguments = None
+        self.converged = False
+        self.status = "pending"
+        self.returncode = None
+        self.attempts = 0
+        self.duration = 0.0
+        self.pid = None
+        self.started = None
+
+    def __repr__(self):
+        return "Job(" + self.name + ", " + self.status + ", returncode=" + str(self.returncode) + ")"
+
+'''
+Creates the CFturbo job that builds the geometry of one .cft-batch variation.
+'''
+def cfturbo_job(variation, timeout=None, retries=0):
+
+    name = os.path.basename(variation).split(".")[0]
+
+    return Job(name, [CFTURBO_EXE, "-batch", variation], "CFturbo", timeout, retries)
+
+'''
+Creates the SimericsMP job that solves one .spro file (optionally from an initial .sres solution).
+With convergence criteria the run is stopped early once they are met (see monitor.ConvergenceMonitor).
+'''
+def simerics_job(spro, sres=None, timeout=None, retries=0, convergence_criteria=None, convergence_window=50):
+
+    name = os.path.basename(spro).split(".")[0]
+    command = [SIMERICS_EXE, "-run", spro]
+    if sres is not None:
+        command.append(sres)
+
+    monitor = None
+    if convergence_criteria:
+        monitor = ConvergenceMonitor(spro.split(".")[0] + "_integrals.txt", convergence_criteria, convergence_window)
+
+    job = Job(name, command, "SimericsMP", timeout, retries, monitor=monitor)
+    job.progress_file = spro.split(".")[0] + "_integrals.txt"
+    job.result_file = spro.split(".")[0] + ".sres"
+
+    return job
+
+'''
+Raised by the function of a job whose run converged without leaving its result (see converged_status).
+'''
+class IncompleteRun(Exception):
+    pass
+
+'''
+Status of a run stopped by its monitor: it only counts as done if the stopped solver left a result file
+(and integrals) written during this attempt, since later runs, the cache and the artifact store read them.
+Otherwise it is incomplete: a stopped solver does not always write its result (e.g. terminating a process on
+Windows kills it at once), and solving the converged design again would cost more than the early stop saved.
+Incomplete jobs are not retried and their dependents are skipped.
+
+Outputs:
+status [string] = done or incomplete
+'''
+def converged_status(job, start):
+
+    for file in [job.result_file, job.progress_file]:
+        if file is not None and (not os.path.exists(file) or os.path.getmtime(file) < start):
+            print(job.name + " converged but " + file + " was not written before it was stopped")
+            return "incomplete"
+
+    job.converged = True
+
+    return "done"
+
+'''
+Waits for a solver process, polling the job's monitor and enforcing its timeout.
+
+Outputs:
+status [string] = done, failed, timeout or incomplete
+'''
+def wait_process(process, job, start):
+
+    while True:
+        wait_time = POLL_INTERVAL if job.monitor is not None else None
+        if job.timeout is not None:
+            remaining = max(start + job.timeout - time.time(), 0)
+            wait_time = remaining if wait_time is None else min(wait_time, remaining)
+
+        try:
+            job.returncode = process.wait(timeout=wait_time)
+            return "done" if job.returncode == 0 else "failed"
+        except subprocess.TimeoutExpired:
+            pass
+
+        if job.timeout is not None and time.time() - start >= job.timeout:
+            process.kill()
+            job.returncode = process.wait()
+            return "timeout"
+
+        if job.monitor is None:
+            continue
+        try:
+            converged = job.monitor()
+        except Exception:
+            # Otherwise the solver keeps running next to the retry of the job:
+            process.kill()
+            job.returncode = process.wait()
+            raise
+        if converged:
+            process.terminate()
+            job.returncode = process.wait()
+            return converged_status(job, start)
+
+'''
+Calls the on_done function of a successful job. An error there (e.g. while writing the manifest or the
+results store) only fails this job instead of stopping the whole campaign.
+'''
+def finish(job):
+
+    if job.on_done is None:
+        return
+
+    try:
+        job.on_done()
+    except Exception as error:
+        print(job.name + " failed after finishing: " + str(error))
+        job.status = "failed"
+
+'''
+Runs a single job until it succeeds or runs out of retries (run_dag only hands it over once its tool has a
+free license, so the timeout never counts the wait for a license).
+'''
+def run_job(job):
+
+    while job.attempts <= job.retries:
+        job.attempts += 1
+        job.status = "running"
+        start = time.time()
+        if job.started is None:
+            job.started = start
+
+        try:
+            if job.on_start is not None:
+                job.on_start()
+            if callable(job.command):
+                job.command()
+                job.returncode = 0
+                job.status = "done"
+            else:
+                process = subprocess.Popen(job.command)
+                job.pid = process.pid
+                job.status = wait_process(process, job, start)
+        except IncompleteRun as error:
+            print(job.name + " incomplete: " + str(error))
+            job.status = "incomplete"
+        except Exception as error:
+            print(job.name + " failed: " + str(error))
+            job.status = "failed"
+        finally:
+            job.duration += time.time() - start
+
+        if job.status == "done":
+            finish(job)
+            break
+        if job.status == "incomplete":
+            break
+
+    return job
+
+'''
+Runs solver jobs concurrently.
+
+Inputs:
+jobs [list] = Job objects
+max_jobs [int] = maximum number of jobs running at the same time
+license_caps [dict] = maximum number of concurrent jobs per tool (e.g. {"SimericsMP": 8})
+
+Outputs:
+jobs [list] = the same Job objects with status, returncode, attempts and duration filled in
+'''
+def run_jobs(jobs, max_jobs=1, license_caps=None):
+
+    # Without dependencies the graph scheduler simply runs the jobs in order as slots and licenses free up:
+    return run_dag(jobs, max_jobs, license_caps)
+
+'''
+Runs jobs as a dependency graph: every job starts as soon as all jobs in its depends_on list are
+done, so independent chains (e.g. one chain per design) advance without waiting for each other.
+Jobs whose dependencies failed are skipped. A job is only handed to a worker thread once its tool has a free
+license, so jobs waiting for a license never block the slots of ready jobs of other tools. Every job counts its
+unfinished dependencies and only the dependents of a finished job are updated, so scheduling stays cheap for
+campaigns with thousands of jobs; ready jobs start in the order of the list.
+
+Inputs:
+jobs [list] = Job objects (dependencies outside the list have to be finished already)
+max_jobs [int] = maximum number of jobs running at the same time
+license_caps [dict] = maximum number of concurrent jobs per tool (e.g. {"SimericsMP": 8})
+
+Outputs:
+jobs [list] = the same Job objects with status, returncode, attempts and duration filled in
+'''
+def run_dag(jobs, max_jobs=1, license_caps=None):
+
+    license_caps = license_caps or {}
+    tool_counts = {}
+    order = {job: index for index, job in enumerate(jobs)}
+    remaining = {job: 0 for job in jobs}
+    dependents = {job: [] for job in jobs}
+    skipped = []
+    for job in jobs:
+        for dependency in job.depends_on:
+            if dependency in order:
+                remaining[job] += 1
+                dependents[dependency].append(job)
+            elif dependency.status in ("failed", "timeout", "incomplete", "skipped", "cancelled"):
+                skipped.append(job)
+            elif dependency.status != "done":
+                raise ValueError("Jobs with unresolvable dependencies: " + job.name)
+
+    # Ready jobs per tool as (position in the list, job), so a tool without a free license never holds up the others:
+    ready = {}
+    handled = set()
+
+    def skip(jobs):
+        stack = list(jobs)
+        while stack:
+            job = stack.pop()
+            if job in handled:
+                continue
+            job.status = "skipped"
+            handled.add(job)
+            stack += dependents[job]
+
+    def release(job):
+        if job.status != "done":
+            skip(dependents[job])
+            return
+        for dependent in dependents[job]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0 and dependent not in handled:
+                heapq.heappush(ready.setdefault(dependent.tool, []), (order[dependent], dependent))
+
+    skip(skipped)
+    for job in jobs:
+        if remaining[job] == 0 and job not in handled:
+            heapq.heappush(ready.setdefault(job.tool, []), (order[job], job))
+
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        while True:
+            while len(running) < max_jobs:
+                tools = [(queue[0][0], tool) for tool, queue in ready.items() if queue and tool_counts.get(tool, 0) < license_caps.get(tool, max_jobs)]
+                if not tools:
+                    break
+                job = heapq.heappop(ready[min(tools)[1]])[1]
+                handled.add(job)
+                tool_counts[job.tool] = tool_counts.get(job.tool, 0) + 1
+                running[executor.submit(run_job, job)] = job
+
+            if not running:
+                waiting = [job.name for job in jobs if job not in handled]
+                if waiting:
+                    raise ValueError("Jobs with unresolvable dependencies: " + ", ".join(waiting))
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                tool_counts[job.tool] -= 1
+                release(job)
+
+    report(jobs)
+
+    return jobs
+
+'''
+Prints the jobs that did not finish successfully.
+'''
+def report(jobs):
+
+    for job in jobs:
+        if job.status != "done":
+            print(job.name + " " + job.status + " after " + str(job.attempts) + " attempt(s) (exit status " + str(job.returncode) + ")")
@@ -0,0 +1,176 @@
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.spatial.distance import cdist
+from scipy.stats import norm, qmc
+
+'''
+Gaussian process surrogate (squared exponential kernel) of an objective over the unit hypercube of a
+DesignSpace. The length scale is picked from a grid by the marginal likelihood of the known designs.
+
+Inputs:
+noise [float] = relative noise variance added to the diagonal (solver scatter / numerical jitter)
+length_scales [np.array] = candidate length scales in unit hypercube coordinates
+'''
+class GaussianProcess:
+
+    def __init__(self, noise=1e-6, length_scales=np.geomspace(0.05, 2.0, 16)):
+        self.noise = noise
+        self.length_scales = length_scales
+
+    def kernel(self, x1, x2, length_scale):
+        return np.exp(-0.5*cdist(x1, x2, "sqeuclidean")/length_scale**2)
+
+    '''
+    Fits the surrogate to designs x (one row per design, unit hypercube) with objective values y.
+    '''
+    def fit(self, x, y):
+
+        self.x = x
+        self.y_mean = y.mean()
+        self.y_std = y.std() if y.std() > 0 else 1.0
+        y = (y - self.y_mean)/self.y_std
+
+        best = -np.inf
+        for length_scale in self.length_scales:
+            K = self.kernel(x, x, length_scale) + self.noise*np.eye(len(x))
+            try:
+                factor = cho_factor(K, lower=True)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = cho_solve(factor, y)
+            likelihood = -0.5*y @ alpha - np.log(np.diag(factor[0])).sum()
+            if likelihood > best:
+                best = likelihood
+                self.length_scale, self.factor, self.alpha = length_scale, factor, alpha
+
+        return self
+
+    '''
+    Predicts the objective at designs x.
+
+    Outputs:
+    mean [np.array] = predicted objective values
+    std [np.array] = standard deviation of the prediction
+    '''
+    def predict(self, x):
+
+        k = self.kernel(x, self.x, self.length_scale)
+        mean = k @ self.alpha
+        variance = 1.0 - np.sum(k*cho_solve(self.factor, k.T).T, axis=1)
+
+        return mean*self.y_std + self.y_mean, np.sqrt(np.maximum(variance, 0.0))*self.y_std
+
+'''
+Expected improvement over the best known objective value (maximization).
+'''
+def expected_improvement(mean, std, best):
+
+    std = np.maximum(std, 1e-12)
+    z = (mean - best)/std
+
+    return (mean - best)*norm.cdf(z) + std*norm.pdf(z)
+
+'''
+Proposes the next batch of designs for make_variations by maximizing the expected improvement of a
+Gaussian process fitted to the designs solved so far. Batches are built greedily: every chosen design is
+added to the surrogate with its predicted value (kriging believer) so the batch spreads out.
+
+Inputs:
+design_space [DesignSpace] = sampled variables and their bounds
+values_array [np.array] = designs solved so far (one row per variable, one column per design)
+objective_values [np.array] = objective value of every design (NaN for failed designs, which are ignored)
+batch_size [int] = number of designs to propose
+num_candidates [int] = size of the Sobol candidate set the expected improvement is maximized over
+seed [int] = seed of the candidate set
+
+Outputs:
+values_array [np.array] = proposed designs (one row per variable, one column per design)
+'''
+def propose_batch(design_space, values_array, objective_values, batch_size, num_candidates=4096, seed=None):
+
+    solved = np.isfinite(objective_values)
+    x = design_space.normalize(values_array)[solved]
+    y = objective_values[solved]
+
+    candidates = qmc.Sobol(d=design_space.dimension, scramble=True, seed=seed).random(num_candidates)
+    chosen = []
+
+    for n in range(batch_size):
+        surrogate = GaussianProcess().fit(x, y)
+        mean, std = surrogate.predict(candidates)
+        best = np.argmax(expected_improvement(mean, std, y.max()))
+
+        chosen.append(candidates[best])
+        x = np.vstack((x, candidates[best]))
+        y = np.append(y, mean[best])
+        candidates = np.delete(candidates, best, axis=0)
+
+    return design_space.scale(np.array(chosen))
+
+'''
+Adaptive DOE: solves an initial Sobol sample, then repeatedly fits the surrogate and solves the proposed
+batch until the budget is spent or the best objective value stopped improving.
+
+Inputs:
+design_space [DesignSpace] = sampled variables and their bounds
+evaluate [function] = takes the values array of all designs so far and returns the objective value of every
+                      design (NaN for failed designs); designs solved by an earlier call may be skipped by it
+                      (e.g. through the campaign manifest), or it can be an analytic stand-in for the solver
+initial_size [int] = number of designs of the initial Sobol sample
+batch_size [int] = number of designs proposed per iteration
+budget [int] = maximum total number of designs
+tolerance [float] = relative improvement of the best objective value below which a batch counts as stalled
+patience [int] = number of consecutive stalled batches before stopping
+seed [int] = seed of the initial sample and the candidate sets
+
+Outputs:
+values_array [np.array] = all designs (one row per variable, one column per design)
+objective_values [np.array] = objective value of every design
+'''
+def adaptive_sampling(design_space, evaluate, initial_size, batch_size, budget, tolerance=1e-3, patience=2, seed=None):
+
+    values_array = design_space.sobol(min(initial_size, budget), seed)
+    objective_values = np.asarray(evaluate(values_array), dtype=np.float64)
+
+    stalled = 0
+    iteration = 0
+    while values_array.shape[1] < budget and stalled < patience:
+        best = np.nanmax(objective_values)
+        num_designs = min(batch_size, budget - values_array.shape[1])
+        candidate_seed = None if seed is None else seed + iteration + 1
+
+        new_values = propose_batch(design_space, values_array, objective_values, num_designs, seed=candidate_seed)
+        values_array = np.hstack((values_array, new_values))
+        objective_values = np.asarray(evaluate(values_array), dtype=np.float64)
+
+        improvement = np.nanmax(objective_values) - best
+        stalled = stalled + 1 if improvement <= tolerance*abs(best) else 0
+        iteration += 1
+        print("Adaptive iteration " + str(iteration) + ": " + str(values_array.shape[1]) + " designs, best objective " + str(np.nanmax(objective_values)))
+
+    return values_array, objective_values
+
+'''
+Combines result columns into one objective value per design (higher is better).
+
+Inputs:
+results [pd.DataFrame] = results table (one row per design, e.g. read from results_steady.csv)
+objective [dict] = column name -> "max", "min" or a target value (e.g. {"Eff_tt_stage": "max", "DPtt": 250.0});
+                   targets contribute their negative relative deviation
+
+Outputs:
+objective_values [np.array] = objective value of every row of results
+'''
+def objective_values(results, objective):
+
+    values = np.zeros(len(results))
+    for column, goal in objective.items():
+        column_values = results[column].to_numpy(dtype=np.float64)
+        if goal == "max":
+            values += column_values
+        elif goal == "min":
+            values -= column_values
+        else:
+            values -= np.abs(column_values - goal)/abs(goal)
+
+    return values
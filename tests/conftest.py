@@ -0,0 +1,24 @@
+import os
+import stat
+import sys
+import textwrap
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+'''
+Writes stub executables (Python scripts standing in for CFturbo/SimericsMP) into the test folder.
+
+Outputs:
+make_stub [function] = takes a script name and its source, returns the path of the executable script
+'''
+@pytest.fixture
+def make_stub(tmp_path):
+
+    def make(name, source):
+        path = tmp_path / name
+        path.write_text("#!" + sys.executable + "\n" + textwrap.dedent(source))
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        return str(path)
+
+    return make
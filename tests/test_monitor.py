@@ -0,0 +1,21 @@
+from monitor import ConvergenceMonitor
+
+def write_integrals(path, values):
+
+    with open(path, "w") as outfile:
+        outfile.write("iter\tuserdef.DPtt\n")
+        for iteration, value in enumerate(values):
+            outfile.write(str(iteration) + "\t" + value + "\n")
+
+def test_steady_values_converge(tmp_path):
+
+    write_integrals(tmp_path / "Design1_steady_integrals.txt", ["1000"]*40)
+
+    assert ConvergenceMonitor(str(tmp_path / "Design1_steady_integrals.txt"), {"DPtt": 1e-3}, 20)()
+
+def test_diverged_values_do_not_converge(tmp_path):
+
+    for value in ["nan", "-nan(ind)", "inf"]:
+        write_integrals(tmp_path / "Design1_steady_integrals.txt", [value]*40)
+
+        assert not ConvergenceMonitor(str(tmp_path / "Design1_steady_integrals.txt"), {"DPtt": 1e-3}, 20)()
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+import pytest
+import async_scheduler
+import scheduler
+from scheduler import Job, run_dag, simerics_job
+from async_scheduler import AsyncOrchestrator
+from monitor import ConvergenceMonitor
+
+# Sleeps for argv[2] seconds and appends its start and end time to the file argv[1]:
+SLEEP_STUB = '''
+import sys, time
+start = time.time()
+time.sleep(float(sys.argv[2]))
+with open(sys.argv[1], "a") as outfile:
+    outfile.write("%f %f\\n" % (start, time.time()))
+'''
+
+# Writes the .sres (unless argv[3] is "no_sres"), then an integrals file that converges until it is stopped:
+CONVERGING_STUB = '''
+import sys, time
+base = sys.argv[2].rsplit(".", 1)[0]
+if sys.argv[3:] != ["no_sres"]:
+    with open(base + ".sres", "w") as outfile:
+        outfile.write("solution")
+with open(base + "_integrals.txt", "w") as outfile:
+    outfile.write("iter\\tuserdef.DPtt\\n")
+    for iteration in range(30000):
+        outfile.write("%d\\t%g\\n" % (iteration, 1000*(1 - 0.5**(iteration/10))))
+        outfile.flush()
+        time.sleep(0.001)
+'''
+
+@pytest.fixture(params=["threads", "asyncio"])
+def run(request, tmp_path):
+
+    if request.param == "threads":
+        return run_dag
+
+    return AsyncOrchestrator(str(tmp_path / "logs"), poll_interval=0.05, grace_period=1.0).run
+
+def read_intervals(path):
+
+    with open(path, "r") as infile:
+        return [tuple(float(value) for value in line.split()) for line in infile]
+
+def max_overlap(intervals):
+
+    return max(sum(1 for other in intervals if other[0] < interval[1] and interval[0] < other[1]) for interval in intervals)
+
+def test_timeout_stops_the_run(run, make_stub, tmp_path):
+
+    stub = make_stub("sleep_stub.py", SLEEP_STUB)
+    job = Job("Design1_steady", [stub, str(tmp_path / "runs.txt"), "30"], "SimericsMP", timeout=0.5)
+
+    run([job], 1)
+
+    assert job.status == "timeout"
+    assert job.duration < 10
+
+def test_waiting_for_a_license_does_not_count_towards_the_timeout(run, make_stub, tmp_path):
+
+    stub = make_stub("sleep_stub.py", SLEEP_STUB)
+    jobs = [Job("Design" + str(design) + "_steady", [stub, str(tmp_path / "runs.txt"), "0.6"], "SimericsMP", timeout=1.5) for design in range(2)]
+
+    run(jobs, 2, {"SimericsMP": 1})
+
+    assert [job.status for job in jobs] == ["done", "done"]
+    assert max_overlap(read_intervals(tmp_path / "runs.txt")) == 1
+
+def test_license_caps_limit_concurrent_runs_of_a_tool(run, make_stub, tmp_path):
+
+    stub = make_stub("sleep_stub.py", SLEEP_STUB)
+    jobs = [Job("Design" + str(design), [stub, str(tmp_path / "runs.txt"), "0.4"], "CFturbo") for design in range(6)]
+
+    run(jobs, 6, {"CFturbo": 2})
+
+    assert all(job.status == "done" for job in jobs)
+    assert max_overlap(read_intervals(tmp_path / "runs.txt")) == 2
+
+def test_jobs_waiting_for_a_license_leave_slots_to_other_tools(run, make_stub, tmp_path):
+
+    stub = make_stub("sleep_stub.py", SLEEP_STUB)
+    jobs = [Job("Design" + str(design), [stub, str(tmp_path / "cfturbo.txt"), "1"], "CFturbo") for design in range(3)]
+    jobs.append(Job("Design0_steady", [stub, str(tmp_path / "simerics.txt"), "0.1"], "SimericsMP"))
+
+    start = time.time()
+    run(jobs, 2, {"CFturbo": 1})
+
+    assert all(job.status == "done" for job in jobs)
+    # Started while the first CFturbo run still held the license, not after the queued CFturbo jobs:
+    assert jobs[-1].started - start < 0.8
+
+def test_failed_job_skips_its_chain_only(run):
+
+    def fail():
+        raise RuntimeError("geometry failed")
+
+    chains = []
+    for design, command in enumerate([fail, lambda: None]):
+        chain = [Job("Design" + str(design), command, "python")]
+        for stage in ["_steady", "_steady_post_process"]:
+            chain.append(Job("Design" + str(design) + stage, lambda: None, "python", depends_on=chain[-1:]))
+        chains.append(chain)
+
+    run(chains[0] + chains[1], 2)
+
+    assert [job.status for job in chains[0]] == ["failed", "skipped", "skipped"]
+    assert [job.status for job in chains[1]] == ["done"]*3
+
+def test_cancel_stops_running_jobs_without_retrying_them(make_stub, tmp_path):
+
+    stub = make_stub("sleep_stub.py", SLEEP_STUB)
+    jobs = [Job("Design" + str(design) + "_steady", [stub, str(tmp_path / "runs.txt"), "30"], "SimericsMP", retries=1) for design in range(3)]
+    orchestrator = AsyncOrchestrator(str(tmp_path / "logs"), poll_interval=0.05, grace_period=1.0)
+    threading.Timer(1.0, orchestrator.cancel).start()
+
+    start = time.time()
+    orchestrator.run(jobs, 2)
+
+    assert time.time() - start < 10
+    assert [job.status for job in jobs] == ["cancelled"]*3
+    assert [job.attempts for job in jobs] == [1, 1, 0]
+
+@pytest.fixture
+def converging_job(make_stub, tmp_path, monkeypatch):
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scheduler, "POLL_INTERVAL", 0.1)
+    monkeypatch.setattr(async_scheduler, "POLL_INTERVAL", 0.1)
+    stub = make_stub("converging_stub.py", CONVERGING_STUB)
+
+    def make(*arguments):
+        job = simerics_job("Design1_steady.spro", convergence_criteria={"DPtt": 1e-3}, convergence_window=20)
+        job.command = [stub, "-run", "Design1_steady.spro"] + list(arguments)
+        return job
+
+    return make
+
+def test_monitor_stops_a_converged_run(run, converging_job):
+
+    job = converging_job()
+
+    run([job], 1)
+
+    assert job.status == "done"
+    assert job.converged
+    assert job.duration < 20
+
+def test_converged_run_without_result_file_is_incomplete(run, converging_job):
+
+    job = converging_job("no_sres")
+    job.retries = 1
+    dependent = Job("Design1_steady_post_process", lambda: None, "post_process", depends_on=[job])
+
+    run([job, dependent], 1)
+
+    assert job.status == "incomplete"
+    assert job.attempts == 1
+    assert not job.converged
+    assert dependent.status == "skipped"
+
+def test_result_file_of_an_earlier_run_does_not_count(run, converging_job):
+
+    with open("Design1_steady.sres", "w") as outfile:
+        outfile.write("earlier solution")
+    os.utime("Design1_steady.sres", (time.time() - 3600, time.time() - 3600))
+    job = converging_job("no_sres")
+
+    run([job], 1)
+
+    assert job.status == "incomplete"
+
+def test_monitor_error_stops_the_run(run, converging_job):
+
+    job = converging_job()
+    # The integrals file has no Eff_tt column, so the monitor raises:
+    job.monitor = ConvergenceMonitor("Design1_steady_integrals.txt", {"Eff_tt": 1e-3}, 20)
+
+    run([job], 1)
+
+    assert job.status == "failed"
+    assert job.returncode is not None
+    assert job.duration < 10
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from sampling import DesignSpace
+from surrogate import adaptive_sampling, objective_values
+
+def make_design_space():
+
+    return DesignSpace(["d2", "beta2", "nBl"], ["m", "rad", "-"], ["0.2", "0.4", "Radial"], {"d2": (0.1, 0.3), "beta2": (10.0, 40.0)})
+
+'''
+Analytic stand-in for the solver: a smooth objective with its maximum at d2 = 0.25, beta2 = 20 [deg].
+'''
+def analytic_objective(values_array):
+
+    d2, beta2 = values_array[0], values_array[1]
+
+    return -((d2 - 0.25)/0.2)**2 - ((beta2 - 20.0)/30.0)**2
+
+def test_adaptive_sampling_improves_on_the_initial_sample():
+
+    design_space = make_design_space()
+    calls = []
+
+    def evaluate(values_array):
+        calls.append(values_array.copy())
+        return analytic_objective(values_array)
+
+    values_array, objective = adaptive_sampling(design_space, evaluate, 8, 4, 24, seed=0)
+
+    assert values_array.shape == (3, len(objective))
+    assert 8 < values_array.shape[1] <= 24
+    # Every call sees the designs of the earlier calls unchanged:
+    for earlier, later in zip(calls, calls[1:]):
+        np.testing.assert_array_equal(later[:, :earlier.shape[1]], earlier)
+    assert np.all(np.isnan(values_array[2]))
+    assert objective.max() > analytic_objective(calls[0]).max()
+    assert objective.max() > -0.01
+
+def test_adaptive_sampling_stops_at_the_budget():
+
+    values_array, objective = adaptive_sampling(make_design_space(), analytic_objective, 4, 3, 10, tolerance=-np.inf, seed=1)
+
+    assert values_array.shape[1] == 10
+
+def test_objective_values_combine_goals_and_targets():
+
+    results = pd.DataFrame({"Eff_tt_stage": [0.8, 0.9], "DPtt": [250.0, 200.0]})
+
+    values = objective_values(results, {"Eff_tt_stage": "max", "DPtt": 250.0})
+
+    np.testing.assert_allclose(values, [0.8, 0.9 - 0.2])
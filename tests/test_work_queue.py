@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+from functools import partial
+import numpy as np
+import pytest
+from benchmark import load_pipeline, synthetic_cft_batch, synthetic_spro
+from scheduler import simerics_job
+from warm_start import WarmStart
+from work_queue import WorkQueue
+
+WORK_QUEUE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "work_queue.py")
+
+# SimericsMP stand-in: writes the .sres and integrals of the .spro in argv[2] after a short run:
+SIMERICS_STUB = '''
+import sys, time
+base = sys.argv[2].rsplit(".", 1)[0]
+time.sleep(0.5)
+with open(base + "_integrals.txt", "w") as outfile:
+    outfile.write("iter\\tuserdef.DPtt\\n0\\t1000\\n")
+with open(base + ".sres", "w") as outfile:
+    outfile.write("solution")
+'''
+
+'''
+Starts worker processes on the queue (stopped through the stop file, or killed if they do not exit).
+'''
+@pytest.fixture
+def workers(make_stub, tmp_path):
+
+    env = dict(os.environ, SIMERICS_EXE=make_stub("simerics_stub.py", SIMERICS_STUB))
+    processes = []
+
+    def start(queue_dir, worker_ids):
+        for worker_id in worker_ids:
+            processes.append(subprocess.Popen([sys.executable, WORK_QUEUE, queue_dir, "--jobs", "1", "--worker-id", worker_id, "--idle-exit", "20", "--heartbeat-interval", "0.2"], env=env))
+
+    yield start
+
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+'''
+Renders designs that only differ in their first (continuous) parameter, so they share the topology needed for warm starts.
+'''
+def make_designs(num_designs):
+
+    pipeline = load_pipeline()
+    synthetic_cft_batch("Synthetic_steady.cft-batch", 1, 4)
+    variables, units, components, template = pipeline.make_template(pipeline.parse_cft_batch("Synthetic_steady.cft-batch"), "template_steady.cft-batch")
+
+    values_array = np.repeat(pipeline.numeric_values(template.original_values)[:, np.newaxis], num_designs, axis=1)
+    values_array[0] = np.linspace(0.1, 0.2, num_designs)
+    rad = np.array(units) == "rad"
+    values_array[rad] = np.degrees(values_array[rad])
+
+    variations = pipeline.make_variations(template, units, values_array, "Design")[1:]
+    for variation in variations:
+        synthetic_spro(variation.replace(".cft-batch", ".spro"), 1)
+
+    return variations
+
+def test_two_workers_run_warm_started_jobs(workers, tmp_path, monkeypatch):
+
+    monkeypatch.chdir(tmp_path)
+    variations = make_designs(4)
+    warm_start = WarmStart()
+    jobs = []
+    for variation in variations:
+        spro = variation.replace(".cft-batch", ".spro")
+        job = simerics_job(spro)
+        job.on_start = partial(warm_start.prepare, spro, job)
+        warm_start.add(spro, variation, job)
+        jobs.append(job)
+
+    queue = WorkQueue(str(tmp_path / "queue"), stale_after=10, poll_interval=0.1)
+    workers(queue.queue_dir, ["w1", "w2"])
+    try:
+        queue.run(jobs, 2)
+    finally:
+        queue.stop_workers()
+
+    assert [job.status for job in jobs] == ["done"]*4
+
+    tickets = {}
+    for file in os.listdir(queue.path("done")):
+        with open(queue.path("done", file), "r") as infile:
+            ticket = json.load(infile)
+        tickets[file.split("_")[0]] = ticket
+
+    # Both workers ran jobs at the same time (one slot each):
+    assert set(ticket["result"]["worker"] for ticket in tickets.values()) == {"w1", "w2"}
+    # The first two designs start cold, the later ones from a design solved before them:
+    assert [len(tickets["Design" + str(design)]["command"]) for design in range(1, 5)] == [3, 3, 4, 4]
+    for design in [3, 4]:
+        initial = tickets["Design" + str(design)]["command"][3]
+        assert initial.endswith("_steady.sres") and initial != "Design" + str(design) + "_steady.sres"
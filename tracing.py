@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+'''
+Reads the CPU time and resident memory of every process from /proc (Linux only).
+
+Outputs:
+processes [dict] = pid -> (parent pid, CPU seconds including reaped children, RSS in bytes); empty without /proc
+'''
+def read_processes():
+
+    processes = {}
+    if not os.path.isdir("/proc"):
+        return processes
+
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    page_size = os.sysconf("SC_PAGE_SIZE")
+
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/" + entry + "/stat", "r") as infile:
+                fields = infile.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        cpu = sum(int(field) for field in fields[11:15])/clock_ticks
+        processes[int(entry)] = (int(fields[1]), cpu, int(fields[21])*page_size)
+
+    return processes
+
+'''
+Sums the CPU time and RSS of a process and all of its descendants (solvers may start helper processes).
+
+Outputs:
+cpu [float], rss [int] = CPU seconds and resident bytes of the process tree (None if the process is gone)
+'''
+def process_tree(processes, pid):
+
+    if pid not in processes:
+        return None
+
+    children = {}
+    for child, (parent, _, _) in processes.items():
+        children.setdefault(parent, []).append(child)
+
+    cpu = 0.0
+    rss = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        cpu += processes[current][1]
+        rss += processes[current][2]
+        stack += children.get(current, [])
+
+    return cpu, rss
+
+'''
+Splits a job name into its design and pipeline stage (e.g. Design3_steady -> Design3, SimericsMP steady;
+Design3_steady_modify -> Design3, modify). Designs solved in an earlier run (see the manifest) are skipped.
+'''
+def job_stage(job):
+
+    parts = job.name.split("_", 2)
+    if len(parts) > 2:
+        return parts[0], parts[2]
+    if job.tool == "skipped":
+        return parts[0], "skipped"
+    if job.tool == "python":
+        return parts[0], "restore"
+
+    return parts[0], job.tool + " " + parts[-1]
+
+'''
+Records where the time of a campaign goes: wall time of the pipeline stages of main() (span) and of every
+scheduled job (watch), plus CPU time and peak RSS of the solver processes sampled from /proc while they run
+(jobs run by remote workers or without /proc, e.g. on Windows, only get their wall time). save writes a
+Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev), summary prints the time per stage
+and the slowest designs.
+
+Inputs:
+trace_file [string] = name of the trace .json file
+sample_interval [float] = seconds between two samples of the running solver processes
+'''
+class Tracer:
+
+    def __init__(self, trace_file, sample_interval=1.0):
+        self.trace_file = trace_file
+        self.sample_interval = sample_interval
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.jobs = []
+        self.counters = []
+        self.resources = {}
+
+    def timestamp(self, seconds):
+        return int((seconds - self.start)*1e6)
+
+    '''
+    Times one stage of the pipeline (with tracer.span("post_process"): ...).
+    '''
+    @contextmanager
+    def span(self, name, **args):
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.spans.append({"name": name, "start": start, "duration": time.time() - start, "args": args})
+
+    '''
+    Samples the processes of running jobs while the scheduler runs them (with tracer.watch(jobs): run_jobs(...));
+    the jobs are added to the trace once they are all finished.
+    '''
+    @contextmanager
+    def watch(self, jobs):
+
+        stopped = threading.Event()
+
+        def sample():
+            while not stopped.wait(self.sample_interval):
+                self.sample(jobs)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            sampler.join()
+            with self.lock:
+                self.jobs += [job for job in jobs if job.started is not None]
+
+    def sample(self, jobs):
+
+        processes = read_processes()
+        now = time.time()
+        total_cpu = 0.0
+        total_rss = 0
+
+        for job in jobs:
+            if job.status != "running" or job.pid is None:
+                continue
+            usage = process_tree(processes, job.pid)
+            if usage is None:
+                continue
+            cpu, rss = usage
+            resources = self.resources.setdefault(job, {"cpu": {}, "peak_rss": 0})
+            # CPU time per attempt (retries get a new process):
+            resources["cpu"][job.pid] = max(cpu, resources["cpu"].get(job.pid, 0.0))
+            resources["peak_rss"] = max(rss, resources["peak_rss"])
+            total_cpu += cpu
+            total_rss += rss
+
+        with self.lock:
+            self.counters.append((now, total_cpu, total_rss))
+
+    def job_resources(self, job):
+
+        resources = self.resources.get(job, {"cpu": {}, "peak_rss": 0})
+
+        return sum(resources["cpu"].values()), resources["peak_rss"]
+
+    '''
+    Writes the Chrome trace: pipeline stages on the first track, jobs on as many parallel tracks as ran at the
+    same time, and the total CPU use and RSS of the solver processes as counters.
+    '''
+    def save(self):
+
+        events = [{"name": "process_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "pipeline"}},
+                  {"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "jobs"}}]
+
+        for span in self.spans:
+            events.append({"name": span["name"], "cat": "stage", "ph": "X", "ts": self.timestamp(span["start"]), "dur": int(span["duration"]*1e6), "pid": 0, "tid": 0, "args": span["args"]})
+
+        lanes = []
+        for job in sorted(self.jobs, key=lambda job: job.started):
+            end = job.started + job.duration
+            lane = next((lane for lane, lane_end in enumerate(lanes) if lane_end <= job.started), len(lanes))
+            if lane == len(lanes):
+                lanes.append(end)
+            else:
+                lanes[lane] = end
+
+            design, stage = job_stage(job)
+            cpu, peak_rss = self.job_resources(job)
+            events.append({"name": job.name, "cat": stage, "ph": "X", "ts": self.timestamp(job.started), "dur": int(job.duration*1e6), "pid": 1, "tid": lane,
+                           "args": {"design": design, "status": job.status, "attempts": job.attempts, "cpu_s": round(cpu, 2), "peak_rss_mb": round(peak_rss/1024**2, 1)}})
+
+        previous = None
+        for now, total_cpu, total_rss in self.counters:
+            if previous is not None and now > previous[0]:
+                cores = max(total_cpu - previous[1], 0.0)/(now - previous[0])
+                events.append({"name": "solver resources", "ph": "C", "ts": self.timestamp(now), "pid": 1, "args": {"cpu_cores": round(cores, 2), "rss_mb": round(total_rss/1024**2, 1)}})
+            previous = (now, total_cpu, total_rss)
+
+        with open(self.trace_file, "w") as outfile:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, outfile)
+
+    '''
+    Prints the wall time of the pipeline stages, the wall time, CPU time and peak RSS of the jobs per stage,
+    and the designs that took longest.
+
+    Inputs:
+    num_designs [int] = number of slowest designs listed
+    '''
+    def summary(self, num_designs=5):
+
+        print("Stage".ljust(28) + "Count".rjust(7) + "Wall [s]".rjust(12) + "Mean [s]".rjust(12) + "Max [s]".rjust(12) + "CPU [s]".rjust(12) + "Peak RSS [MB]".rjust(15))
+
+        for span in self.spans:
+            print(span["name"].ljust(28) + "1".rjust(7) + ("%.1f" % span["duration"]).rjust(12))
+
+        stages = {}
+        designs = {}
+        for job in self.jobs:
+            design, stage = job_stage(job)
+            cpu, peak_rss = self.job_resources(job)
+            stages.setdefault(stage, []).append((job.duration, cpu, peak_rss))
+            designs[design] = designs.get(design, 0.0) + job.duration
+
+        for stage, runs in sorted(stages.items(), key=lambda item: -sum(run[0] for run in item[1])):
+            wall = [run[0] for run in runs]
+            print(stage.ljust(28) + str(len(runs)).rjust(7) + ("%.1f" % sum(wall)).rjust(12) + ("%.1f" % (sum(wall)/len(wall))).rjust(12) + ("%.1f" % max(wall)).rjust(12)
+                  + ("%.1f" % sum(run[1] for run in runs)).rjust(12) + ("%.1f" % (max(run[2] for run in runs)/1024**2)).rjust(15))
+
+        if designs:
+            print("Slowest designs (summed job wall time):")
+            for design, wall in sorted(designs.items(), key=lambda item: -item[1])[:num_designs]:
+                print("  " + design.ljust(26) + ("%.1f s" % wall).rjust(12))
@@ -0,0 +1,162 @@
+import math
+import mmap
+import numpy as np
+import pandas as pd
+
+'''
+Parses the time of the integrals row starting at a byte offset of a memory-mapped integrals file.
+
+Outputs:
+time [float] = time of the row (None for an empty or incomplete row)
+'''
+def row_time(data, offset, time_index, delimiter):
+
+    end = data.find(b"\n", offset)
+    if end == -1:
+        return None
+
+    try:
+        return float(data[offset:end].split(delimiter)[time_index])
+    except (ValueError, IndexError):
+        return None
+
+'''
+Finds the first row of an integrals file at or after a given time by bisecting the byte offsets of the
+memory-mapped file, so only a few rows are parsed however long the run is (the time column has to increase).
+
+Outputs:
+offset [int] = byte offset of the row
+'''
+def find_time_offset(data, header_end, start_time, time_index, delimiter):
+
+    low = header_end
+    high = len(data)
+    while low < high:
+        start = max(data.rfind(b"\n", low, (low + high)//2) + 1, low)
+        time = row_time(data, start, time_index, delimiter)
+        if time is not None and time < start_time:
+            low = data.find(b"\n", start) + 1
+        else:
+            high = start
+
+    return low
+
+'''
+Revolution-locked analysis of transient integrals. Instead of a fixed number of rows, the last whole
+revolutions of the run (from the time column and the rotor speed) are resampled onto an equidistant phase
+grid, so the mean covers whole revolutions and every user defined expression gets its phase-averaged
+waveform (one revolution), its pulsation amplitude (half the peak-to-peak of the waveform) and the amplitude
+of its shaft order harmonics (blade passing orders if blade_count is given) from an FFT. Only the analysed
+revolutions are read (see find_time_offset), so the memory use does not depend on the size of the file.
+
+Inputs:
+revolutions [int] = number of whole revolutions analysed at the end of the run
+bins_per_revolution [int] = phase grid points per revolution (None = time steps per revolution of the run)
+blade_count [int] = number of blades; the FFT amplitudes are reported at multiples of the blade passing order (None = shaft orders)
+harmonics [int] = number of reported harmonics
+time_column [string] = name of the time column of the integrals file
+prefix [string] = only columns starting with prefix are analysed
+delimiter [string] = delimiter used within the integrals file
+'''
+class RevolutionAnalysis:
+
+    def __init__(self, revolutions=5, bins_per_revolution=None, blade_count=None, harmonics=3, time_column="time", prefix="userdef.", delimiter="\t"):
+        self.revolutions = revolutions
+        self.bins_per_revolution = bins_per_revolution
+        self.blade_count = blade_count
+        self.harmonics = harmonics
+        self.time_column = time_column
+        self.prefix = prefix
+        self.delimiter = delimiter
+
+    '''
+    Reads the rows of the last revolutions (plus the row before them, needed for the interpolation).
+
+    Outputs:
+    time [np.array] = time of every row
+    values [pd.DataFrame] = columns starting with prefix
+    start_time [float] = start of the first analysed revolution
+    revolutions [int] = number of whole revolutions covered (at most self.revolutions)
+    '''
+    def read_window(self, integral_file, period):
+
+        delimiter = self.delimiter.encode()
+
+        with open(integral_file, "rb") as infile:
+            names = infile.readline().decode().rstrip("\r\n").split(self.delimiter)
+            header_end = infile.tell()
+            time_index = names.index(self.time_column)
+
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                last = data.rfind(b"\n", header_end, len(data) - 1) + 1
+                while last > header_end and row_time(data, last, time_index, delimiter) is None:
+                    last = data.rfind(b"\n", header_end, last - 1) + 1
+                first_time = row_time(data, header_end, time_index, delimiter)
+                last_time = row_time(data, max(last, header_end), time_index, delimiter)
+                if first_time is None or last_time is None:
+                    raise ValueError(integral_file + " has no complete rows")
+
+                # Revolutions start at multiples of the period, so phase 0 is the rotor position at time 0:
+                end_time = math.floor(last_time/period + 1e-9)*period
+                revolutions = min(self.revolutions, math.floor((end_time - first_time)/period + 1e-9))
+                if revolutions < 1:
+                    raise ValueError(integral_file + " covers less than one whole revolution")
+
+                start_time = end_time - revolutions*period
+                offset = find_time_offset(data, header_end, start_time, time_index, delimiter)
+                if offset > header_end:
+                    offset = max(data.rfind(b"\n", header_end, offset - 1) + 1, header_end)
+
+            infile.seek(offset)
+            columns = [self.time_column] + [name for name in names if name.startswith(self.prefix)]
+            window = pd.read_csv(infile, sep=self.delimiter, header=None, names=names, usecols=columns, dtype=np.float64).dropna()
+
+        return window.pop(self.time_column).values, window, start_time, revolutions
+
+    '''
+    Analyses the last revolutions of a transient run.
+
+    Inputs:
+    integral_file [string] = name of the _integrals.txt file
+    omega [float] = rotor speed [rad/s]
+
+    Outputs:
+    window [pd.DataFrame] = values resampled on the phase grid of the analysed revolutions (mean = revolution average)
+    statistics [pd.DataFrame] = pulsation and harmonic amplitudes (one row each) of every column
+    phase [pd.DataFrame] = phase-averaged waveform of every column over one revolution, indexed by phase [deg]
+    '''
+    def analyze(self, integral_file, omega):
+
+        period = 2*math.pi/abs(omega)
+        time, values, start_time, revolutions = self.read_window(integral_file, period)
+
+        bins = self.bins_per_revolution
+        if bins is None:
+            steps = np.diff(time)
+            bins = int(min(max(round(period/np.median(steps[steps > 0])), 8), 3600))
+
+        grid = start_time + (np.arange(revolutions*bins) + 0.5)*period/bins
+
+        # Linear interpolation of all columns at once:
+        right = np.searchsorted(time, grid).clip(1, len(time) - 1)
+        step = time[right] - time[right - 1]
+        weight = np.divide(grid - time[right - 1], step, out=np.ones_like(grid), where=step > 0).clip(0, 1)
+        array = values.values
+        resampled = array[right - 1] + weight[:, np.newaxis]*(array[right] - array[right - 1])
+
+        waveform = resampled.reshape(revolutions, bins, -1).mean(axis=0)
+        spectrum = np.abs(np.fft.rfft(resampled, axis=0))*2/len(grid)
+
+        order = self.blade_count or 1
+        rows = {"pulsation": (waveform.max(axis=0) - waveform.min(axis=0))/2}
+        for harmonic in range(1, self.harmonics + 1):
+            # The window holds whole revolutions, so shaft order n falls on FFT bin n*revolutions:
+            frequency_bin = harmonic*order*revolutions
+            if frequency_bin < len(spectrum):
+                rows["order_" + str(harmonic*order)] = spectrum[frequency_bin]
+
+        window = pd.DataFrame(resampled, columns=values.columns)
+        statistics = pd.DataFrame(rows, index=values.columns).T
+        phase = pd.DataFrame(waveform, columns=values.columns, index=pd.Index((np.arange(bins) + 0.5)*360/bins, name="phase [deg]"))
+
+        return window, statistics, phase
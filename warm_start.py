@@ -0,0 +1,126 @@
+import os
+import threading
+import numpy as np
+from cft_batch import parse_cft_batch
+from modify_spro import load_spro_model
+
+'''
+Warm start of steady runs: a design is solved from the .sres of the nearest design that is already solved
+instead of from scratch. Designs are compared in normalized parameter space (every continuous variable of
+the .cft-batch scaled by its spread over all registered designs). Only designs with the same topology are
+used: equal integer/text variables (e.g. blade numbers) and equal interfaces, impellers and patches in the
+.spro. Without such a design the run starts cold.
+
+Inputs:
+max_distance [float] = largest normalized distance of a warm start design (None = no limit)
+'''
+class WarmStart:
+
+    def __init__(self, max_distance=None):
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        self.designs = {}
+        self.parameters = {}
+        self.topologies = {}
+
+    '''
+    Registers a design as candidate for warm starts once its solve job is done.
+
+    Inputs:
+    spro [string] = .spro file of the design
+    variation [string] = .cft-batch variation of the design
+    job [Job] = job that finishes once the design is solved (None = solved in an earlier run)
+    '''
+    def add(self, spro, variation, job=None):
+
+        with self.lock:
+            self.designs[spro] = (variation, job)
+
+    '''
+    Splits the values of a variation into continuous parameters and the topology (integer and text values).
+
+    Outputs:
+    values [np.array] = continuous parameter values
+    topology [tuple] = integer and text values
+    '''
+    def describe(self, spro):
+
+        if spro not in self.parameters:
+            cft_batch = parse_cft_batch(self.designs[spro][0])
+            values = []
+            topology = []
+            for value, unit in zip(cft_batch.original_values, cft_batch.units):
+                try:
+                    number = float(value)
+                except ValueError:
+                    topology.append(value)
+                    continue
+                if unit == "-" and value.strip().lstrip("-").isdigit():
+                    topology.append(value.strip())
+                else:
+                    values.append(number)
+            self.parameters[spro] = (np.array(values), tuple(topology))
+
+        return self.parameters[spro]
+
+    '''
+    Mesh topology of a design from its .spro (only read once the .spro exists).
+    '''
+    def spro_topology(self, spro):
+
+        if spro not in self.topologies:
+            model = load_spro_model(spro)
+            self.topologies[spro] = repr((model["MGI_tuples"], model["impellers"], model["DPtt_patches"]))
+
+        return self.topologies[spro]
+
+    '''
+    Finds the nearest solved design with the same topology.
+
+    Outputs:
+    nearest [string] = .spro file of the nearest design (None = cold start)
+    '''
+    def nearest(self, spro):
+
+        with self.lock:
+            values, topology = self.describe(spro)
+            candidates = []
+            for candidate, (variation, job) in self.designs.items():
+                if candidate == spro or (job is not None and job.status != "done") or not os.path.exists(candidate.replace(".spro", ".sres")):
+                    continue
+                candidate_values, candidate_topology = self.describe(candidate)
+                if candidate_topology == topology and len(candidate_values) == len(values) and self.spro_topology(candidate) == self.spro_topology(spro):
+                    candidates.append((candidate, candidate_values))
+
+            if not candidates:
+                return None
+
+            everything = [self.describe(design)[0] for design in self.designs]
+            everything = np.array([design for design in everything if len(design) == len(values)])
+            spread = everything.max(axis=0) - everything.min(axis=0)
+            scale = np.where(spread > 0, spread, np.inf)
+
+        distances = [np.linalg.norm((candidate_values - values)/scale) for _, candidate_values in candidates]
+        best = int(np.argmin(distances))
+        if self.max_distance is not None and distances[best] > self.max_distance:
+            return None
+
+        return candidates[best][0]
+
+    '''
+    Sets the .sres of the nearest solved design as initial solution of a steady solve job. Used as the job's
+    on_start, so the choice is made when the run actually starts and sees every design solved until then.
+    '''
+    def prepare(self, spro, solve):
+
+        # Jobs run by a work queue keep their arguments apart from the function running them:
+        command = solve.command if solve.arguments is None else solve.arguments
+        del command[3:]
+
+        nearest = self.nearest(spro)
+        if nearest is None:
+            print(os.path.basename(spro).split(".")[0] + " starts cold (no solved design with the same topology)")
+            return
+
+        print(os.path.basename(spro).split(".")[0] + " starts from " + os.path.basename(nearest).split(".")[0])
+        command.append(nearest.replace(".spro", ".sres"))
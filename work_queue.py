@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from scheduler import CFTURBO_EXE, SIMERICS_EXE, IncompleteRun, Job, run_job, run_dag
+from monitor import ConvergenceMonitor
+
+'''
+Tools whose jobs are sent to the workers (everything else, e.g. .spro modification and post-processing,
+runs on the coordinator), with the executable each worker uses for them.
+'''
+EXECUTABLES = {"CFturbo": CFTURBO_EXE, "SimericsMP": SIMERICS_EXE}
+
+'''
+Work queue on a shared filesystem (e.g. an NFS campaign directory) between one coordinator and workers on
+any number of nodes. Every job is a JSON ticket moved between folders of the queue:
+pending/<job>.json -> claimed/<worker>@<job>.json -> done/<job>.json
+Workers claim tickets with an atomic rename and touch heartbeats/<worker> while they live; the coordinator
+moves the claimed tickets of workers whose heartbeat is older than stale_after back to pending.
+
+Inputs:
+queue_dir [string] = folder of the queue (inside the campaign directory; created if missing)
+stale_after [float] = seconds without heartbeat after which a worker counts as dead
+poll_interval [float] = seconds between two checks of the queue
+max_requeues [int] = number of times a ticket is requeued after its worker died before it counts as failed
+'''
+class WorkQueue:
+
+    def __init__(self, queue_dir, stale_after=120.0, poll_interval=2.0, max_requeues=3):
+        self.queue_dir = os.path.abspath(queue_dir)
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.max_requeues = max_requeues
+        for folder in ["pending", "claimed", "done", "heartbeats"]:
+            os.makedirs(os.path.join(self.queue_dir, folder), exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.queue_dir, *parts)
+
+    '''
+    Writes a ticket atomically (temporary file in the queue folder, then renamed into place). Tickets are made
+    group writable, since workers of other users may have to claim and complete them.
+    '''
+    def write_ticket(self, path, ticket):
+
+        handle, temp_file = tempfile.mkstemp(prefix=".tmp_", dir=self.queue_dir)
+        if hasattr(os, "fchmod"):
+            # mkstemp creates the file readable by its owner only:
+            os.fchmod(handle, 0o664)
+        with os.fdopen(handle, "w") as outfile:
+            json.dump(ticket, outfile)
+        os.replace(temp_file, path)
+
+    def read_ticket(self, path):
+
+        with open(path, "r") as infile:
+            return json.load(infile)
+
+    def publish(self, name, ticket):
+        self.write_ticket(self.path("pending", name + ".json"), ticket)
+
+    '''
+    Claims the oldest pending ticket (the rename fails for all but one worker).
+
+    Outputs:
+    name [string], ticket [dict] = claimed ticket (None if the queue is empty)
+    '''
+    def claim(self, worker_id):
+
+        for file in sorted(os.listdir(self.path("pending"))):
+            claimed = self.path("claimed", worker_id + "@" + file)
+            try:
+                os.rename(self.path("pending", file), claimed)
+            except FileNotFoundError:
+                continue
+            return file[:-len(".json")], self.read_ticket(claimed)
+
+        return None
+
+    def heartbeat(self, worker_id):
+
+        with open(self.path("heartbeats", worker_id), "a"):
+            pass
+        os.utime(self.path("heartbeats", worker_id))
+
+    '''
+    Records the result of a claimed ticket. The result is dropped if the ticket was requeued in the
+    meantime (the worker was taken for dead), since another worker runs it again.
+    '''
+    def complete(self, worker_id, name, result):
+
+        claimed = self.path("claimed", worker_id + "@" + name + ".json")
+        try:
+            ticket = self.read_ticket(claimed)
+        except FileNotFoundError:
+            return
+
+        ticket["result"] = result
+        self.write_ticket(self.path("done", name + ".json"), ticket)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            pass
+
+    '''
+    Moves the tickets of dead workers back to pending (or to done as failed after max_requeues).
+    '''
+    def requeue_stale(self):
+
+        now = time.time()
+        for entry in os.scandir(self.path("claimed")):
+            worker_id, file = entry.name.split("@", 1)
+            try:
+                alive = now - os.path.getmtime(self.path("heartbeats", worker_id)) < self.stale_after
+            except FileNotFoundError:
+                alive = False
+            if alive:
+                continue
+
+            try:
+                ticket = self.read_ticket(entry.path)
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+
+            ticket["requeues"] = ticket.get("requeues", 0) + 1
+            print("Worker " + worker_id + " stopped responding, requeueing " + file[:-len(".json")])
+            if ticket["requeues"] > self.max_requeues:
+                ticket["result"] = {"status": "failed", "returncode": None, "converged": False, "worker": worker_id}
+                self.write_ticket(self.path("done", file), ticket)
+            else:
+                self.write_ticket(self.path("pending", file), ticket)
+
+    '''
+    Turns a solver job into a job of the queue: its command publishes a ticket and waits for a worker to run it.
+    Convergence monitoring and timeouts are done by the worker.
+    '''
+    def distribute(self, job):
+
+        if job.tool not in EXECUTABLES or callable(job.command):
+            return job
+
+        ticket = {"tool": job.tool, "timeout": job.timeout, "monitor": None, "result_file": job.result_file, "progress_file": job.progress_file}
+        if isinstance(job.monitor, ConvergenceMonitor):
+            criteria = dict(zip([name[len("userdef."):] for name in job.monitor.names], job.monitor.tolerances))
+            ticket["monitor"] = {"integral_file": job.monitor.follower.integral_file, "criteria": criteria, "window": job.monitor.window}
+
+        job.arguments = job.command
+        job.command = partial(self.run_remote, job, ticket)
+        job.monitor = None
+
+        return job
+
+    '''
+    Publishes the ticket of one attempt of a job (with the arguments of the job at that time, e.g. the initial
+    solution chosen by its on_start) and waits for its result (requeueing the tickets of dead workers meanwhile).
+    '''
+    def run_remote(self, job, ticket):
+
+        name = job.name + "_" + job.tool + "_" + str(job.attempts)
+        if os.path.exists(self.path("done", name + ".json")):
+            # Result of an earlier run of the campaign:
+            os.remove(self.path("done", name + ".json"))
+        self.publish(name, dict(ticket, command=job.arguments))
+
+        while True:
+            try:
+                result = self.read_ticket(self.path("done", name + ".json"))["result"]
+                break
+            except FileNotFoundError:
+                self.requeue_stale()
+                time.sleep(self.poll_interval)
+
+        job.converged = result["converged"]
+        if result["status"] == "incomplete":
+            raise IncompleteRun("remote run on " + result["worker"] + " converged without writing " + str(job.result_file))
+        if result["status"] != "done":
+            raise RuntimeError("remote run " + result["status"] + " on " + result["worker"] + " (exit status " + str(result["returncode"]) + ")")
+
+    '''
+    Runs jobs as a dependency graph (see scheduler.run_dag) with the solver jobs executed by the workers.
+    max_jobs should cover the total number of solver slots of all workers.
+    '''
+    def run(self, jobs, max_jobs=1, license_caps=None):
+
+        if os.path.exists(self.path("stop")):
+            os.remove(self.path("stop"))
+
+        for job in jobs:
+            self.distribute(job)
+
+        return run_dag(jobs, max_jobs, license_caps)
+
+    '''
+    Asks all workers to exit once their running jobs are done.
+    '''
+    def stop_workers(self):
+
+        with open(self.path("stop"), "w"):
+            pass
+
+'''
+Runs one claimed ticket and records its result.
+'''
+def run_ticket(queue, worker_id, name, ticket):
+
+    command = [EXECUTABLES.get(ticket["tool"], ticket["command"][0])] + ticket["command"][1:]
+    job = Job(name, command, ticket["tool"], ticket["timeout"])
+    job.result_file = ticket.get("result_file")
+    job.progress_file = ticket.get("progress_file")
+    if ticket["monitor"] is not None:
+        job.monitor = ConvergenceMonitor(ticket["monitor"]["integral_file"], ticket["monitor"]["criteria"], ticket["monitor"]["window"])
+
+    print(worker_id + " running " + name)
+    run_job(job)
+    queue.complete(worker_id, name, {"status": job.status, "returncode": job.returncode, "converged": job.converged, "duration": job.duration, "worker": worker_id})
+
+'''
+Worker loop: claims and runs tickets until the coordinator asks the workers to stop (or the queue stayed empty
+for idle_exit seconds). Jobs run in the campaign directory holding the queue.
+
+Inputs:
+queue_dir [string] = folder of the queue (see WorkQueue)
+max_jobs [int] = number of jobs this worker runs at the same time
+worker_id [string] = unique worker name (None = <host>-<pid>)
+idle_exit [float] = seconds with an empty queue before the worker exits (None = wait for the stop file)
+heartbeat_interval [float] = seconds between two heartbeats (has to be well below the stale_after of the coordinator)
+'''
+def run_worker(queue_dir, max_jobs=1, worker_id=None, idle_exit=None, heartbeat_interval=10.0):
+
+    queue = WorkQueue(queue_dir)
+    worker_id = worker_id or socket.gethostname() + "-" + str(os.getpid())
+    os.chdir(os.path.dirname(queue.queue_dir))
+
+    stopped = threading.Event()
+    queue.heartbeat(worker_id)
+
+    def beat():
+        while not stopped.wait(heartbeat_interval):
+            queue.heartbeat(worker_id)
+
+    threading.Thread(target=beat, daemon=True).start()
+    slots = threading.Semaphore(max_jobs)
+    idle_since = time.time()
+
+    def run(name, ticket):
+        try:
+            run_ticket(queue, worker_id, name, ticket)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        while not os.path.exists(queue.path("stop")):
+            slots.acquire()
+            claimed = queue.claim(worker_id)
+            if claimed is None:
+                slots.release()
+                if idle_exit is not None and time.time() - idle_since > idle_exit:
+                    break
+                time.sleep(queue.poll_interval)
+                continue
+            idle_since = time.time()
+            executor.submit(run, *claimed)
+
+    stopped.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs CFturbo/SimericsMP jobs of a campaign work queue on this node.")
+    parser.add_argument("queue_dir")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--worker-id")
+    parser.add_argument("--idle-exit", type=float)
+    parser.add_argument("--heartbeat-interval", type=float, default=10.0)
+    args = parser.parse_args()
+    run_worker(args.queue_dir, args.jobs, args.worker_id, args.idle_exit, args.heartbeat_interval)